@@ -2,37 +2,55 @@ from datetime import datetime, timezone
 from faker import Faker
 from bson import ObjectId
 
+import os
 import random
 import uuid
 import re
 import logging
 
+def _or_default(value, default):
+    """Returns default for unset (None) parameter fields; keeps explicit falsy values like 0."""
+    return default if value is None else value
+
 class DataManager:
-    faker = Faker()
+    # Unweighted provider sampling: plain random.choice instead of weighted choices per call
+    faker = Faker(use_weighting=False)
     
     _default_date_format = "%Y-%m-%dT%H:%M:%S.%fZ"
 
-    # Regex cache for concat (avoid recompiling)
-    _concat_pattern = re.compile(r"\{@\w+\}")
+    # Regex cache for concat (matches '{@name}' placeholders)
+    _concat_pattern = re.compile(r"\{@(\w+)\}")
     
     # Type-to-function mapping (avoid giant if/elif chain)
     _type_generators = {
         'guid': lambda p, v: uuid.uuid4(),
         'objectid': lambda p, v: ObjectId(),
         'datetime': lambda p, v: datetime.strptime(
-            datetime.now(timezone.utc).strftime(p.get('format', DataManager._default_date_format)),
-            p.get('format', DataManager._default_date_format)
+            datetime.now(timezone.utc).strftime(p.format or DataManager._default_date_format),
+            p.format or DataManager._default_date_format
         ),
         'unix_timestamp': lambda p, v: int(datetime.now(timezone.utc).timestamp()),
-        'random_int': lambda p, v: random.randint(p.get('start', 0), p.get('end', 100)),
-        'random_float': lambda p, v: random.uniform(p.get('start', 0.0), p.get('end', 1.0)),
-        'random_list': lambda p, v: random.choice(p.get('list', [])),
-        'random_bool': lambda p, v: random.choice([True, False]),
+        'random_int': lambda p, v: random.randint(_or_default(p.start, 0), _or_default(p.end, 100)),
+        'random_float': lambda p, v: random.uniform(_or_default(p.start, 0.0), _or_default(p.end, 1.0)),
+        'random_list': lambda p, v: random.choice(p.choices),
+        'random_bool': lambda p, v: bool(random.getrandbits(1)),
         'random_string': lambda p, v: ''.join(random.choice(
-            p.get('chars', "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789")
-        ) for _ in range(p.get('length', 10))),
-        'constant': lambda p, v: p.get('value'),
+            p.chars or "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+        ) for _ in range(_or_default(p.length, 10))),
+        'constant': lambda p, v: p.value,
+    }
+
+    # Batch generators (n values per call) for types with a cheaper bulk form
+    _batch_generators = {
+        'guid': lambda p, n: DataManager._uuid4_batch(n),
+        'random_int': lambda p, n: random.choices(range(_or_default(p.start, 0), _or_default(p.end, 100) + 1), k=n),
+        'random_float': lambda p, n: [random.uniform(_or_default(p.start, 0.0), _or_default(p.end, 1.0)) for _ in range(n)],
+        'random_list': lambda p, n: random.choices(p.choices, k=n),
+        'random_bool': lambda p, n: DataManager._random_bools(n),
     }
+
+    # Types whose value is shared by a whole batch (one clock read / conversion per batch)
+    _batch_shared_types = frozenset(('constant', 'datetime', 'unix_timestamp'))
     
     # SQL type mapping (static cache)
     _sql_type_map = {
@@ -45,59 +63,141 @@ class DataManager:
         bytes: "varbinary",
     }
 
+    # Generator resolved per raw 'type' string (filled lazily by _resolve_generator)
+    _resolved_generators = {}
+
     @staticmethod
     def generate_param_value(param, values=None):
-        param_type = param.get('type').lower()
-        values = values or {}
+        """Generates a value and its inferred SQL type (used for SQL Server parameter definitions)."""
+        value = DataManager.generate_value(param, values)
+        return value, DataManager._infer_sql_type(value)
 
-        raw_value = DataManager._generate_raw_value(param_type, param, values)
+    @staticmethod
+    def generate_value(param, values=None):
+        """Generates a value for a parameter, without SQL type inference."""
+        param_type = param.type
+        generator = DataManager._resolved_generators.get(param_type)
+        if generator is None:
+            generator = DataManager._resolve_generator(param_type)
+
+        raw_value = generator(param, values or {})
         
-        output_type = param.get('as')
+        output_type = param.as_type
         if output_type:
-            converted_value = DataManager._convert_type(raw_value, output_type.lower(), param)
-            return converted_value, DataManager._infer_sql_type(converted_value)
+            return DataManager._convert_type(raw_value, output_type.lower(), param)
         
-        return raw_value, DataManager._infer_sql_type(raw_value)
+        return raw_value
 
     @staticmethod
-    def _generate_raw_value(param_type, param, values):
-        """Generates raw value based on type (optimized with dict lookup)."""
-        
-        # Dict lookup is O(1) vs if/elif which is O(n)
-        if param_type in DataManager._type_generators:
-            return DataManager._type_generators[param_type](param, values)
-        
-        # Concat needs special logic
-        if param_type == "concat":
-            return DataManager._handle_concat(param, values)
+    def bind_generator(param):
+        """Returns a zero-argument callable generating values for param, with type dispatch and 'as' conversion resolved once."""
+        param_type = param.type
+        generator = DataManager._resolved_generators.get(param_type)
+        if generator is None:
+            generator = DataManager._resolve_generator(param_type)
+        values = {}
+
+        output_type = param.as_type
+        if output_type:
+            output_type = output_type.lower()
+            if param_type == 'datetime' and output_type in ("string", "str"):
+                # Format one clock read directly, skipping the strptime round trip and the conversion dispatch
+                date_format = param.format or DataManager._default_date_format
+                return lambda: datetime.now(timezone.utc).strftime(date_format)
+            convert_type = DataManager._convert_type
+            return lambda: convert_type(generator(param, values), output_type, param)
+
+        return lambda: generator(param, values)
+
+    @staticmethod
+    def generate_param_values_batch(param, n, values=None):
+        """Generates n values for a parameter in one call (no SQL type inference)."""
+        param_type = param.type.lower()
+        if param_type in DataManager._batch_shared_types:
+            return [DataManager.generate_value(param, values)] * n
+
+        batch_generator = DataManager._batch_generators.get(param_type)
+        if batch_generator is None:
+            return [DataManager.generate_value(param, values) for _ in range(n)]
+
+        output_type = param.as_type
+        if output_type:
+            output_type = output_type.lower()
+            # Format GUID strings straight from random hex instead of building UUID objects
+            if param_type == 'guid' and output_type in ("string", "str"):
+                return DataManager._uuid4_strings(n)
+
+        raw_values = batch_generator(param, n)
+
+        if output_type:
+            return [DataManager._convert_type(value, output_type, param) for value in raw_values]
+
+        return raw_values
+
+    @staticmethod
+    def compile_batch_generator(parameters):
+        """Returns a callable generating n rows (value tuples in parameter order), filled one column per batch call."""
+        parameters = list(parameters)
+        if not parameters:
+            return lambda n: [()] * n
+
+        generate_batch = DataManager.generate_param_values_batch
+
+        def generate_rows(n):
+            return list(zip(*[generate_batch(param, n) for param in parameters]))
+        return generate_rows
+
+    @staticmethod
+    def _random_bools(n):
+        """Generates n random booleans from the bits of a single getrandbits call."""
+        bits = random.getrandbits(n)
+        return [(bits >> i) & 1 == 1 for i in range(n)]
+
+    @staticmethod
+    def _uuid4_batch(n):
+        """Generates n random (version 4) UUIDs from a single os.urandom call."""
+        data = os.urandom(16 * n)
+        return [uuid.UUID(bytes=data[i:i + 16], version=4) for i in range(0, 16 * n, 16)]
+
+    @staticmethod
+    def _uuid4_strings(n):
+        """Generates n random (version 4) UUID strings, setting the version/variant nibbles in the hex."""
+        h = os.urandom(16 * n).hex()
+        return [
+            f"{h[i:i + 8]}-{h[i + 8:i + 12]}-4{h[i + 13:i + 16]}-{'89ab'[int(h[i + 16], 16) & 3]}{h[i + 17:i + 20]}-{h[i + 20:i + 32]}"
+            for i in range(0, 32 * n, 32)
+        ]
+
+    @staticmethod
+    def _resolve_generator(param_type):
+        """Resolves the generator for a type once, so later calls are a single dict lookup."""
+        key = param_type.lower()
         
-        # Faker integration with method chaining support
-        if param_type.startswith("faker."):
-            return DataManager._call_faker_method(param_type[6:], param)
+        generator = DataManager._type_generators.get(key)
+        if generator is None:
+            # Concat needs special logic
+            if key == "concat":
+                generator = DataManager._handle_concat
+            # Faker integration with method chaining support
+            elif key.startswith("faker."):
+                method_name = key[6:]
+                generator = lambda p, v: DataManager._call_faker_method(method_name, p)
+            else:
+                generator = lambda p, v: DataManager._unknown_type(key)
         
+        DataManager._resolved_generators[param_type] = generator
+        return generator
+
+    @staticmethod
+    def _unknown_type(param_type):
         logging.warning(f"Unknown parameter type: {param_type}. Returning empty string.")
         return ""
     
     @staticmethod
     def _handle_concat(param, values):
-        """Concat optimization using list comprehension and cached regex."""
-        value_str = param.get('value', '')
-        parts = []
-        last_end = 0
-        
-        for match in DataManager._concat_pattern.finditer(value_str):
-            # Add text before placeholder
-            parts.append(value_str[last_end:match.start()])
-            # Add placeholder value
-            key = match.group(0)[2:-1]  # Remove {@...}
-            parts.append(str(values.get(key, '')))
-            last_end = match.end()
-        
-        # Add remaining string
-        if last_end < len(value_str):
-            parts.append(value_str[last_end:])
-        
-        return ''.join(parts)
+        """Concat in a single regex pass (missing placeholders render as empty)."""
+        get = values.get
+        return DataManager._concat_pattern.sub(lambda match: str(get(match.group(1), '')), param.value or '')
 
     @staticmethod
     def _convert_type(value, target_type, param):
@@ -111,7 +211,7 @@ class DataManager:
                 if isinstance(value, ObjectId):
                     return str(value)
                 if isinstance(value, datetime):
-                    return value.strftime(param.get('format', DataManager._default_date_format))
+                    return value.strftime(param.format or DataManager._default_date_format)
                 return str(value)
             
             # Int conversion
@@ -197,7 +297,7 @@ class DataManager:
                 return ""
             
             # Execute first method (args only apply to first method)
-            args = param.get('args', {})
+            args = param.args
             result = faker_method(**args) if callable(faker_method) else faker_method
             
             # Chain remaining methods automatically
@@ -214,7 +314,7 @@ class DataManager:
             
             # Convert datetime if needed
             if isinstance(result, datetime):
-                return result.strftime(param.get('format', DataManager._default_date_format))
+                return result.strftime(param.format or DataManager._default_date_format)
             
             return result
                 
@@ -1,25 +1,140 @@
 import re
-import copy
-from typing import Any, Dict, List
-from collections import defaultdict
+import sys
+import time
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Compiled once at import; rendered statements are interned so every executor shares one string per statement
+_param_pattern = re.compile(r'@\w+')
+
+@lru_cache(maxsize=2048)
+def _render_sql(sql: str, mapping_items: tuple) -> str:
+    """Replace @variables in SQL with their mapped values or %s (cached per template/mapping)."""
+    mapping = dict(mapping_items)
+    return sys.intern(_param_pattern.sub(lambda m: mapping.get(m.group(), "%s"), sql))
+
+@lru_cache(maxsize=2048)
+def _render_sql_default(sql: str) -> str:
+    """Replace all @variables in SQL with %s (cached per template)."""
+    return sys.intern(_param_pattern.sub("%s", sql))
+
+def _fast_clone(obj: Any) -> Any:
+    """Clone a JSON-shaped template: dicts and lists are copied, scalars are shared."""
+    if isinstance(obj, dict):
+        return {k: _fast_clone(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_fast_clone(v) for v in obj]
+    return obj
+
+def _clone_spine(obj: Any, spine: Dict[Any, Any]) -> Any:
+    """Shallow-copy obj and the containers on the spine; untouched subtrees are shared."""
+    obj_copy = obj.copy()
+    for key, sub_spine in spine.items():
+        obj_copy[key] = _clone_spine(obj[key], sub_spine)
+    return obj_copy
+
+def _compile_path_setter(path: List[Any]) -> Callable[[Any, Any], None]:
+    """Compile a template path into a setter with literal keys, e.g. o['doc'][0]['id'] = v."""
+    if all(type(key) in (str, int) for key in path):
+        source = f"def setter(o, v):\n    o{''.join(f'[{key!r}]' for key in path)} = v\n"
+        namespace: Dict[str, Any] = {}
+        exec(source, namespace)
+        return namespace['setter']
+
+    # Keys without a safe literal form (e.g. YAML dates) walk the path instead
+    def setter(o, v):
+        for key in path[:-1]:
+            o = o[key]
+        o[path[-1]] = v
+    return setter
+
+def _compile_spine_clone(spine: Dict[Any, Any]) -> Callable[[Any], Any]:
+    """Compile a spine into straight-line copy code, e.g. c = o.copy(); c0 = c['doc'] = c['doc'].copy()."""
+    lines = ["def clone(o):", "    c = o.copy()"]
+
+    def emit(node, parent):
+        for key, sub_spine in node.items():
+            if type(key) not in (str, int):
+                return False
+            var = f"c{len(lines)}"
+            lines.append(f"    {var} = {parent}[{key!r}] = {parent}[{key!r}].copy()")
+            if not emit(sub_spine, var):
+                return False
+        return True
+
+    if not emit(spine, "c"):
+        # Keys without a safe literal form (e.g. YAML dates) walk the spine instead
+        return partial(_clone_spine, spine=spine)
+
+    lines.append("    return c")
+    namespace: Dict[str, Any] = {}
+    exec("\n".join(lines) + "\n", namespace)
+    return namespace['clone']
+
+def _compile_param_setters(template: Any, param_names: List[str]) -> Tuple[List[Tuple[str, Callable[[Any, Any], None]]], Dict[Any, Any]]:
+    """Walk a template once, compiling a setter for every parameter position.
+
+    Returns the (param, setter) pairs and the spine: a nested map of the containers
+    that lead to parameter positions (leaves excluded), used by _clone_spine.
+    """
+    names = set(param_names)
+    setters: List[Tuple[str, Callable[[Any, Any], None]]] = []
+
+    def recurse(o, path):
+        node = None
+        for k, v in (o.items() if isinstance(o, dict) else enumerate(o)):
+            if isinstance(v, str) and v in names:
+                setters.append((v, _compile_path_setter(path + [k])))
+                if node is None:
+                    node = {}
+            elif isinstance(v, (dict, list)):
+                child = recurse(v, path + [k])
+                if child is not None:
+                    if node is None:
+                        node = {}
+                    node[k] = child
+        return node
+
+    spine = recurse(template, []) if isinstance(template, (dict, list)) else None
+    return setters, spine or {}
 
 class BaseExecutor:
     abstract = True
-    _param_pattern = re.compile(r'@\w+')
+    _param_pattern = _param_pattern
 
     def __init__(self, environment):
         self.environment = environment
+        self._param_map_cache: Dict[str, Dict[str, Any]] = {}
+        # Bound once: every request event goes straight to the EventHook
+        self._fire_request = environment.events.request.fire
 
-    def _fire_event(self, request_type: str, name: str, response_time: float, exception: Exception = None, response_length: int = 0) -> None:
+    def _fire_event(self, request_type: str, name: str, response_time: float, exception: Exception = None, response_length: int = 0, context: Optional[Dict[str, Any]] = None) -> None:
         """Fire a request event."""
-        self.environment.events.request.fire(
+        self._fire_request(
             request_type=request_type,
             name=name,
             response_time=response_time,
             exception=exception,
             response_length=response_length,
+            context=context or {},
         )
 
+    def _record(self, request_type: str, name: str, start_time: int, exception: Exception = None, response_length: int = 0, context: Optional[Dict[str, Any]] = None) -> None:
+        """Fire a request event timed from start_time (a time.perf_counter_ns() reading), in whole milliseconds."""
+        self._fire_request(
+            request_type=request_type,
+            name=name,
+            response_time=(time.perf_counter_ns() - start_time) // 1_000_000,
+            exception=exception,
+            response_length=response_length,
+            context=context or {},
+        )
+
+    @classmethod
+    def shareable(cls, environment: Any) -> bool:
+        """Whether one executor can serve every user of a worker process, i.e. it holds no per-user connection."""
+        return False
+
     def _connect(self) -> None:
         raise NotImplementedError("Subclasses must implement this method.")
     
@@ -28,51 +143,51 @@ class BaseExecutor:
 
     def _replace_string_params(self, sql: str, mapping: Dict[str, str]) -> str:
         """Replace all @variables in SQL with their mapped values or %s."""
-        return self._param_pattern.sub(lambda m: mapping.get(m.group(), "%s"), sql)
+        return _render_sql(sql, tuple(sorted(mapping.items())))
     
     def _replace_string_default(self, sql: str) -> str:
         """Replace all @variables in SQL with %s."""
-        return self._param_pattern.sub("%s", sql)
-
-    def _map_all_param_paths(self, obj: Any, param_names: List[str]) -> Dict[str, List[List[Any]]]:
-        """Map all parameter names to their paths in a nested object."""
-        result = defaultdict(list)
-        def recurse(o, current_path=None):
-            if current_path is None:
-                current_path = []
-            if isinstance(o, dict):
-                for k, v in o.items():
-                    for param in param_names:
-                        if v == param:
-                            result[param].append(current_path + [k])
-                    if isinstance(v, (dict, list)):
-                        recurse(v, current_path + [k])
-            elif isinstance(o, list):
-                for idx, item in enumerate(o):
-                    for param in param_names:
-                        if item == param:
-                            result[param].append(current_path + [idx])
-                    if isinstance(item, (dict, list)):
-                        recurse(item, current_path + [idx])
-        recurse(obj)
-        return dict(result)
-
-    def _replace_json_param_at_paths(self, obj: Any, paths: List[List[Any]], value: Any) -> Any:
-        """Replace all occurrences at the given paths in obj with value."""
-        for path in paths:
-            target = obj
-            for key in path[:-1]:
-                target = target[key]
-            target[path[-1]] = value
-        return obj
-
-    def _replace_all_params(self, obj: Any, param_paths_dict: Dict[str, List[List[Any]]], param_values: Dict[str, Any], deepcopy_obj: bool = True) -> Any:
-        """Replace all parameters in obj using the provided paths and values."""
-        obj_copy = copy.deepcopy(obj) if deepcopy_obj else obj
-        for param, paths in param_paths_dict.items():
-            self._replace_json_param_at_paths(obj_copy, paths, param_values[param])
+        return _render_sql_default(sql)
+
+    def _prepare_json_command(self, cache_key: str, parameters: List[Dict[str, Any]], **templates: Any) -> Dict[str, Any]:
+        """Compile parameter setters for each template once per task and cache the result."""
+        cache = self._param_map_cache.get(cache_key)
+        if cache is None:
+            param_names = [param.name for param in parameters]
+            setters = {}
+            cloners = {}
+            for name, template in templates.items():
+                setters[name], spine = _compile_param_setters(template, param_names)
+                cloners[name] = _compile_spine_clone(spine) if isinstance(template, (dict, list)) else None
+            cache = {
+                'parameters': parameters,
+                'param_names': param_names,
+                'templates': templates,
+                'setters': setters,
+                'cloners': cloners
+            }
+            self._param_map_cache[cache_key] = cache
+        return cache
+
+    def _replace_all_params(self, obj: Any, setters: List[Tuple[str, Callable[[Any, Any], None]]], param_values: Dict[str, Any], clone: Callable[[Any], Any] = None) -> Any:
+        """Replace all parameters in a copy of obj using the compiled path setters and values.
+
+        With a compiled spine clone, only the containers leading to parameters are copied and
+        static subtrees are shared with the template; without one the whole template is cloned.
+        """
+        obj_copy = clone(obj) if clone is not None else _fast_clone(obj)
+        for param, setter in setters:
+            setter(obj_copy, param_values[param])
         return obj_copy    
 
+    @staticmethod
+    def _count_items(iterable: Any) -> int:
+        """Drain an iterable (query pager or cursor) and return how many items it produced, without keeping them."""
+        count = 0
+        for _ in iterable:
+            count += 1
+        return count
+
     def execute(self, command: Any) -> None:
         """Subclasses must implement this method."""
         raise NotImplementedError("Subclasses must implement this method.")
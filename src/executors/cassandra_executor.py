@@ -1,6 +1,7 @@
 import logging
 import re
 import settings
+import threading
 import time
 
 from cassandra.cluster import Cluster, NoHostAvailable
@@ -17,6 +18,7 @@ from typing import Any, Dict, Optional, List
 class CassandraExecutor(BaseExecutor):
     # Compile regex pattern once at class level
     _param_pattern = re.compile(r'@(\w+)')
+    _comment_pattern = re.compile(r'--[^\n]*')
     # Optimal concurrency for Cassandra bulk operations
     _MAX_CONCURRENCY = 100
     
@@ -24,9 +26,15 @@ class CassandraExecutor(BaseExecutor):
         super().__init__(environment)
         self.cluster: Optional[Cluster] = None
         self.session = None
+        self._session_lock = threading.Lock()
         self._connect()
         self.prepared_statements: Dict[str, Dict[str, Any]] = {}
 
+    @classmethod
+    def shareable(cls, environment: Any) -> bool:
+        # The session is thread-safe and pools its own connections; consistency is set per statement
+        return True
+
     def _connect(self) -> None:
         """Establish Cassandra cluster connection with timeout."""
         try:
@@ -81,6 +89,39 @@ class CassandraExecutor(BaseExecutor):
             self.cluster.shutdown()
             self.cluster = None
 
+    def _get_session(self):
+        """Return the live session, reconnecting once (under a lock) if it was lost."""
+        session = self.session
+        if session is not None:
+            return session
+        with self._session_lock:
+            if self.session is None:
+                logging.error("No Cassandra session available. Attempting to reconnect.")
+                self._connect()
+                if self.session is None:
+                    logging.error("Reconnection to Cassandra failed.")
+            return self.session
+
+    def _reset_session(self, failed_session) -> None:
+        """Replace a session that lost every host, once for all users sharing this executor."""
+        with self._session_lock:
+            # Another user already replaced it
+            if self.session is not failed_session:
+                return
+            logging.info("Attempting to reconnect due to connection error")
+            # Shutting down the cluster also shuts down its sessions, pools and threads
+            cluster = self.cluster
+            self.session = None
+            self.cluster = None
+            if cluster is not None:
+                try:
+                    cluster.shutdown()
+                except Exception as e:
+                    logging.error(f"Error shutting down Cassandra cluster: {e}")
+            # Statements prepared on the old session are re-prepared on the new one
+            self.prepared_statements.clear()
+        self._get_session()
+
     def run_startup(self, workloadName: str) -> None:
         """Execute CQL startup script to create keyspace, tables and indexes."""
         try:
@@ -96,17 +137,9 @@ class CassandraExecutor(BaseExecutor):
                 cql_script = file.read()
 
             # Split CQL script into individual statements (Cassandra requires one statement per execute)
-            # Remove comments and split by semicolon
-            statements = []
-            for line in cql_script.split('\n'):
-                # Remove line comments
-                line = re.sub(r'--.*$', '', line).strip()
-                if line:
-                    statements.append(line)
-            
-            # Join lines and split by semicolon
-            full_script = ' '.join(statements)
-            cql_statements = [stmt.strip() for stmt in full_script.split(';') if stmt.strip()]
+            # Remove line comments from the whole script once, then split by semicolon
+            clean_script = self._comment_pattern.sub('', cql_script)
+            cql_statements = [stmt.strip() for stmt in clean_script.split(';') if stmt.strip()]
 
             # Execute each statement individually
             success_count = 0
@@ -127,23 +160,37 @@ class CassandraExecutor(BaseExecutor):
         except Exception as e:
             logging.error(f"Error occurred while executing startup script file: {startup}. Exception: {e}")
 
-    def _prepare_statement(self, cql: str, task_name: str) -> Optional[Dict[str, Any]]:
-        """Prepare a CQL statement for better performance."""
+    def _prepare_statement(self, cql: str, task_name: str, consistency_level: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Prepare a CQL statement for better performance.
+
+        A consistencyLevel is set on the prepared statement, so every statement bound from it
+        uses it without touching the session default shared by other tasks and users.
+        """
         if task_name not in self.prepared_statements:
             try:
-                # Use class-level compiled pattern for better performance
-                param_names = self._param_pattern.findall(cql)
-                
-                # Replace @param with ? for Cassandra prepared statements
-                cql_prepared = self._param_pattern.sub('?', cql)
+                # One scan splits the CQL into alternating literal segments and @param names,
+                # then the segments are joined with ? for Cassandra prepared statements
+                segments = self._param_pattern.split(cql)
+                param_names = segments[1::2]
+                cql_prepared = '?'.join(segments[0::2])
                 
                 prepared = self.session.prepare(cql_prepared)
+                if consistency_level:
+                    target_consistency = getattr(ConsistencyLevel, consistency_level.upper(), None)
+                    if target_consistency is not None:
+                        prepared.consistency_level = target_consistency
+                    else:
+                        logging.warning(f"Unknown consistencyLevel {consistency_level} for task {task_name}, using the session default")
                 
-                # Cache statement with unique param names as set for faster lookups
+                # Cache each unique param name with the bind positions it fills
+                param_positions = {}
+                for index, param_name in enumerate(param_names):
+                    param_positions.setdefault(param_name, []).append(index)
+
                 self.prepared_statements[task_name] = {
                     'statement': prepared,
                     'param_names': param_names,
-                    'unique_param_names': set(param_names)  # Cached for _generate_param_values
+                    'param_positions': list(param_positions.items())  # Cached for _generate_param_values
                 }
                 logging.debug(f"Prepared statement for task {task_name}: {cql_prepared} with params: {param_names}")
             except Exception as e:
@@ -153,113 +200,104 @@ class CassandraExecutor(BaseExecutor):
 
     def execute(self, command: Dict, task_name: str) -> None:
         """Execute a Cassandra command using prepared statements with concurrent execution."""
-        if self.session is None:
-            logging.error("No Cassandra session available. Attempting to reconnect.")
-            self._connect()
-            if self.session is None:
-                logging.error("Reconnection to Cassandra failed.")
-                return
+        session = self._get_session()
+        if session is None:
+            return
 
         # All preparation outside the timer
         command_def = command.get('definition', '')
         batch_size = command.get('batchSize', 1)
         params = command.get('parameters', [])
-        param_definitions = {param.get('name', '').lstrip('@'): param for param in params}
+        param_definitions = {param.name.lstrip('@'): param for param in params}
 
         # Prepare statement (cached after first call)
-        prepared_data = self._prepare_statement(command_def, task_name)
+        prepared_data = self._prepare_statement(command_def, task_name, command.get('consistencyLevel'))
         if prepared_data is None:
             logging.error(f"Failed to prepare statement for task {task_name}")
             return
 
-        # Set consistency level before timing (only if different)
-        consistency_level = command.get('consistencyLevel')
-        original_consistency = None
-        if consistency_level:
-            target_consistency = getattr(ConsistencyLevel, consistency_level.upper(), None)
-            if target_consistency and target_consistency != self.session.default_consistency_level:
-                original_consistency = self.session.default_consistency_level
-                self.session.default_consistency_level = target_consistency
+        # Bind hot-path attributes to locals once per call
+        statement = prepared_data['statement']
+        perf_counter_ns = time.perf_counter_ns
+        fire_event = self._fire_event
 
-        # Generate all parameter values before timing
+        # Generate all parameter values before timing, in a single call
+        parameters_list = self._generate_param_values(prepared_data, param_definitions, batch_size)
         if batch_size == 1:
-            param_values = self._generate_param_values(prepared_data, param_definitions)
+            param_values = parameters_list[0]
         else:
             # Use optimal concurrency (max 100 for best Cassandra performance)
             concurrency = min(batch_size, self._MAX_CONCURRENCY)
-            parameters_list = [
-                self._generate_param_values(prepared_data, param_definitions)
-                for _ in range(batch_size)
-            ]
         
-        logging.debug(f"Executing command: {prepared_data} with params: {parameters_list if batch_size > 1 else param_values}, batch size: {batch_size}")
+        logging.debug("Executing command: %s with params: %s, batch size: %s", prepared_data, parameters_list if batch_size > 1 else param_values, batch_size)
 
-        start_time = time.perf_counter()
+        start_time = perf_counter_ns()
         
         try:
             if batch_size == 1:
-                result = self.session.execute(prepared_data['statement'], param_values)
+                result = session.execute(statement, param_values)
             else:
                 execute_concurrent_with_args(
-                    self.session,
-                    prepared_data['statement'],
+                    session,
+                    statement,
                     parameters_list,
                     concurrency=concurrency,
                     raise_on_first_error=False
                 )
                 result = None
 
-            total_time = int((time.perf_counter() - start_time) * 1000)
+            total_time = (perf_counter_ns() - start_time) // 1_000_000
 
+            # Row count of the fetched page; avoids stringifying every row just for metrics
             response_length = 0
-            if result:
-                response_length = sum(len(str(row)) for row in result)
+            if result is not None:
+                response_length = len(result.current_rows)
 
             result = None
 
-            # Restore consistency level after timing
-            if original_consistency is not None:
-                self.session.default_consistency_level = original_consistency
-
-            logging.debug(f"Cassandra executed {batch_size} statements in {total_time}ms, response size: {response_length} bytes")
-            self._fire_event('Cassandra', task_name, total_time, response_length=response_length)
+            logging.debug("Cassandra executed %s statements in %sms, response rows: %s", batch_size, total_time, response_length)
+            fire_event('Cassandra', task_name, total_time, response_length=response_length)
             
-        except (NoHostAvailable, OperationTimedOut) as e:
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event('Cassandra-Error', task_name, total_time, exception=e)
+        except NoHostAvailable as e:
+            total_time = (perf_counter_ns() - start_time) // 1_000_000
+            fire_event('Cassandra-Error', task_name, total_time, exception=e)
             logging.error(f"Cassandra connection error: {e}")
-            
-            # Restore consistency level even on error
-            if original_consistency is not None:
-                self.session.default_consistency_level = original_consistency
-            
-            # Attempt to reconnect on connection errors
-            logging.info("Attempting to reconnect due to connection error")
-            self._connect()
-            
+            self._reset_session(session)
+
+        except OperationTimedOut as e:
+            # A single request timing out says nothing about the session shared by the other users; the driver
+            # replaces failed connections itself
+            total_time = (perf_counter_ns() - start_time) // 1_000_000
+            fire_event('Cassandra-Error', task_name, total_time, exception=e)
+            logging.error(f"Cassandra request timed out: {e}")
+
         except Exception as e:
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event('Cassandra-Error', task_name, total_time, exception=e)
+            total_time = (perf_counter_ns() - start_time) // 1_000_000
+            fire_event('Cassandra-Error', task_name, total_time, exception=e)
             logging.exception(f"Error executing Cassandra command: {e}")
-            
-            # Restore consistency level even on error
-            if original_consistency is not None:
-                self.session.default_consistency_level = original_consistency
-
-    def _generate_param_values(self, prepared_data: Dict, param_definitions: Dict) -> List[Any]:
-        """Generate parameter values for a single execution."""
-        # Early return if no parameters
-        if not prepared_data['param_names']:
-            return []
-        
-        # Use cached unique param names from prepared statement
-        param_map = {}
-        for param_name in prepared_data['unique_param_names']:
-            if param_name in param_definitions:
-                param_map[param_name] = DataManager.generate_param_value(param_definitions[param_name])[0]
-            else:
-                param_map[param_name] = None
-        
-        return [param_map.get(name) for name in prepared_data['param_names']]
+
+    def _generate_param_values(self, prepared_data: Dict, param_definitions: Dict, batch_size: int) -> List[Any]:
+        """Generate bind values for batch_size executions, one column per unique parameter."""
+        generate_rows = prepared_data.get('generate_rows')
+        if generate_rows is None:
+            generate_rows = prepared_data['generate_rows'] = self._compile_row_generator(prepared_data, param_definitions)
+        return generate_rows(batch_size)
+
+    @staticmethod
+    def _compile_row_generator(prepared_data: Dict, param_definitions: Dict):
+        """Compile a generator of bind value rows in placeholder order."""
+        param_names = prepared_data['param_names']
+        defined = [name for name, _ in prepared_data['param_positions'] if name in param_definitions]
+        generate_rows = DataManager.compile_batch_generator([param_definitions[name] for name in defined])
+        if param_names == defined:
+            return generate_rows
+
+        # Repeated placeholders reuse one column; placeholders without a definition bind None
+        index = {name: i for i, name in enumerate(defined)}
+        positions = [index.get(name) for name in param_names]
+
+        def generate_bind_rows(n):
+            return [[row[i] if i is not None else None for i in positions] for row in generate_rows(n)]
+        return generate_bind_rows
 
 
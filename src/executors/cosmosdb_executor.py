@@ -1,10 +1,13 @@
+import atexit
 import logging
+import threading
 import time
-import sys
 
 from azure.cosmos import CosmosClient, exceptions
+from dataclasses import replace
 from datamanager import DataManager
 from executors.base_executor import BaseExecutor
+from functools import partial
 from typing import Any, Dict, Optional
 
 # Set up logging once at module level
@@ -14,32 +17,86 @@ logger.setLevel(logging.WARNING)
 logger = logging.getLogger('urllib3')
 logger.setLevel(logging.WARNING)
 
+# Process-wide caches shared by every executor (i.e. all Locust users) in a worker. Building
+# container clients and compiling ops is local work that never yields to another greenlet,
+# so a racing first call can at worst compile the same entry twice.
+_container_cache: Dict[Any, Any] = {}
+_param_map_cache: Dict[str, Dict[str, Any]] = {}
+
+# One CosmosClient (and HTTP session pool) per process and client configuration, shared by every executor
+_client_lock = threading.Lock()
+_shared_clients: Dict[Any, CosmosClient] = {}
+
+def _close_shared_clients() -> None:
+    """Close the shared clients on interpreter shutdown."""
+    for client in _shared_clients.values():
+        try:
+            client.close()
+        except Exception as e:
+            logging.error(f"Error closing CosmosDB client: {e}")
+    _shared_clients.clear()
+
+atexit.register(_close_shared_clients)
+
+class _ChargeCollector:
+    """response_hook summing the RU charge of every response of one request.
+
+    The SDK passes each response's own headers to the hook; the client's last_response_headers
+    is shared by every user of the client and may already belong to another request.
+    """
+    __slots__ = ('charge',)
+
+    def __init__(self):
+        self.charge = 0.0
+
+    def __call__(self, headers: Any, result: Any) -> None:
+        self.charge += float(headers.get('x-ms-request-charge', 0))
+
 class CosmosDBExecutor(BaseExecutor):
+    # Service limit for operations in one transactional batch
+    _MAX_BATCH_OPERATIONS = 100
+
     def __init__(self, environment: Any):
         super().__init__(environment)
+        self._param_map_cache = _param_map_cache
+        self._container_cache = _container_cache
         self.client: Optional[CosmosClient] = None
         self._connect()
-        self._param_map_cache: Dict[str, Dict] = {}
-        self._container_cache: Dict[Any, Any] = {}
+
+    @classmethod
+    def shareable(cls, environment: Any) -> bool:
+        # Users only share the client and the compiled ops
+        return True
 
     def _connect(self) -> None:
         """Establish CosmosDB client connection."""
         try:
-            self.client = CosmosClient.from_connection_string(
-                self.environment.parsed_options.cosmosdb_connection_string
-            )
-            logging.debug("CosmosDB connection established.")
+            options = self.environment.parsed_options
+            preferred_regions = [region.strip() for region in (options.cosmosdb_preferred_regions or '').split(',') if region.strip()]
+            client_kwargs = {'preferred_locations': preferred_regions} if preferred_regions else {}
+            client_key = (options.cosmosdb_connection_string, tuple(preferred_regions))
+            with _client_lock:
+                client = _shared_clients.get(client_key)
+                if client is None:
+                    client = CosmosClient.from_connection_string(
+                        options.cosmosdb_connection_string,
+                        **client_kwargs
+                    )
+                    _shared_clients[client_key] = client
+                    logging.debug("CosmosDB connection established.")
+            self.client = client
         except Exception as e:
             logging.exception(f"CosmosDB connection error: {e}")
             self.client = None
 
     def _disconnect(self) -> None:
+        """Release this executor's reference; the shared client stays open for other users until exit."""
         if self.client:
             self.client = None
 
     def _get_container(self, db_name: str, container_name: str):
         """Get or cache CosmosDB container client."""
-        cache_key = (db_name, container_name)
+        cache_key = (self.environment.parsed_options.cosmosdb_connection_string, db_name, container_name)
         if cache_key not in self._container_cache:
             db = self.client.get_database_client(db_name)
             container = db.get_container_client(container_name)
@@ -56,92 +113,165 @@ class CosmosDBExecutor(BaseExecutor):
                 return
 
         command_type = command.get('type')
-        db_name = command.get('database')
-        container_name = command.get('container')
-        container = self._get_container(db_name, container_name)
-
-        cache_key = f"{task_name}:{command_type}"
-        cache = self._param_map_cache.get(cache_key)
-        if not cache:
-            parameters = command.get('parameters', [])
-
-            for param in parameters:
-                if param.get('type') == 'datetime':
-                    param['as'] = 'string'
-
-            param_names = [param.get('name') for param in parameters]
-            json_template = command.get('document', {})
-            param_paths_dict = self._map_all_param_paths(json_template, param_names)
-            cache = {
-                'parameters': parameters,
-                'param_names': param_names,
-                'param_paths_dict': param_paths_dict,
-                'json_template': json_template
-            }
-            self._param_map_cache[cache_key] = cache
-        else:
-            parameters = cache['parameters']
-            param_names = cache['param_names']
-            param_paths_dict = cache['param_paths_dict']
-            json_template = cache['json_template']
+        # A task's command type is fixed, so its name alone keys the compiled op
+        cache = self._param_map_cache.get(task_name)
+        op = cache.get('op') if cache else None
+        if op is None:
+            # Binding the task can fail on a bad config (e.g. a missing container); report it as a failed request
+            start_time = time.perf_counter_ns()
+            try:
+                op = self._compile_op(command, task_name)
+            except Exception as e:
+                self._record('CosmosDB-Error', task_name, start_time, exception=e)
+                logging.exception(f"Error preparing CosmosDB command: {e}")
+                return
+            if op is None:
+                return
+        build_args, run = op
 
-        # Generate parameter values
-        param_values = {param['name']: DataManager.generate_param_value(param)[0] for param in parameters}
+        # Generate parameter values and build the request arguments before timing
+        args = build_args()
+        # Lazy %-style arguments: the (possibly large) documents are only formatted when DEBUG is on
+        logging.debug("Executing CosmosDB %s command: %s", command_type, args)
 
-        result = None
-        db_op = None
+        start_time = time.perf_counter_ns()
+        try:
+            count, charge = run(*args)
+            self._record('CosmosDB', task_name, start_time, response_length=count, context={'request_charge': charge})
+            logging.debug("CosmosDB %s command returned %s items for %s RU", command_type, count, charge)
+        except exceptions.CosmosResourceNotFoundError:
+            self._record(f'CosmosDB-{command_type}-NotFound', task_name, start_time)
+        except Exception as e:
+            self._record('CosmosDB-Error', task_name, start_time, exception=e)
+            logging.exception(f"Error executing CosmosDB command: {e}")
+
+    def _compile_op(self, command: Dict, cache_key: str):
+        """Bind a task's container, templates and fields into a cached (build_args, run) op.
+
+        build_args() generates fresh parameter values and returns the positional arguments
+        for run, so execute only times run(*args) and never re-reads the command. run returns
+        the reported response length (item count) and the request's summed RU charge.
+        """
+        command_type = command.get('type')
+        container = self._get_container(command.get('database'), command.get('container'))
+
+        parameters = command.get('parameters', [])
+        if cache_key not in self._param_map_cache:
+            parameters = [replace(param, as_type='string') if param.type == 'datetime' else param for param in parameters]
+
+        cache = self._prepare_json_command(cache_key, parameters, document=command.get('document', {}))
+        setters = cache['setters']['document']
+        clone = cache['cloners']['document']
+        json_template = cache['templates']['document']
+        parameters = cache['parameters']
+        param_generators = [(param.name, DataManager.bind_generator(param)) for param in parameters]
+
+        def generate():
+            return {name: generator() for name, generator in param_generators}
 
         if command_type in ('insert', 'upsert'):
-            document = self._replace_all_params(command.get('document', {}), param_paths_dict, param_values)
-            if command_type == 'insert':
-                db_op = lambda: container.create_item(body=document)
+            batch_size = command.get('batchSize', 1)
+            if batch_size > 1:
+                pk_fields = command.get('partitionKey')
+                if not pk_fields:
+                    logging.error("CosmosDB batch insert/upsert requires 'partitionKey' to group documents.")
+                    return None
+                operation = 'create' if command_type == 'insert' else 'upsert'
+                pk_builder = self._compile_partition_key_builder(pk_fields)
+
+                def build_args():
+                    return (self._build_batches(pk_builder, batch_size, operation, parameters, json_template, setters, clone),)
+                run = partial(self._execute_batches, container)
             else:
-                db_op = lambda: container.upsert_item(body=document)
-            
-            logging.debug(f"Executing CosmosDB {command_type} command: {document}")
+                def build_args():
+                    return (self._replace_all_params(json_template, setters, generate(), clone),)
+                run = partial(self._execute_single, container.create_item if command_type == 'insert' else container.upsert_item)
         elif command_type in ('delete', 'point_read'):
-            id_field = command.get('id')
-            pk_fields = command.get('partitionKey', [])
-            item_id = param_values.get(id_field, id_field)
-            if isinstance(pk_fields, list):
-                pk_value = [param_values.get(pk, pk) for pk in pk_fields]
-                if len(pk_value) == 1:
-                    pk_value = pk_value[0]
-            else:
-                pk_value = param_values.get(pk_fields, pk_fields)
-            if command_type == 'delete':
-                db_op = lambda: container.delete_item(item=item_id, partition_key=pk_value)
-            else:
-                db_op = lambda: container.read_item(item=item_id, partition_key=pk_value)
-            
-            logging.debug(f"Executing CosmosDB {command_type} command: pk: {pk_value}, id: {item_id}")
+            id_builder = self._compile_field_builder(command.get('id'))
+            pk_builder = self._compile_partition_key_builder(command.get('partitionKey', []))
+
+            def build_args():
+                param_values = generate()
+                return (id_builder(param_values), pk_builder(param_values))
+            run = partial(self._execute_single, container.delete_item if command_type == 'delete' else container.read_item)
         elif command_type == 'select':
             query = command.get('query')
-            query_parameters = [
-                {"name": param['name'], "value": param_values[param['name']]}
-                for param in parameters if param['name'] in param_values
-            ]
-            db_op = lambda: list(container.query_items(
-                query=query,
-                parameters=query_parameters,
-                enable_cross_partition_query=True
-            ))
-            logging.debug(f"Executing CosmosDB {command_type} command: {query}, params: {query_parameters}")
+            # Only parameters the query text references are generated and sent
+            query_names = set(self._param_pattern.findall(query or ''))
+            query_generators = [(name, generator) for name, generator in param_generators if name in query_names]
+
+            def build_args():
+                return ([{"name": name, "value": generator()} for name, generator in query_generators],)
+
+            def run(query_parameters):
+                # Stream page by page, keeping only the item count and the summed page charges
+                count = 0
+                collector = _ChargeCollector()
+                for page in container.query_items(
+                    query=query,
+                    parameters=query_parameters,
+                    enable_cross_partition_query=True,
+                    response_hook=collector
+                ).by_page():
+                    for _ in page:
+                        count += 1
+                return count, collector.charge
         else:
             logging.error(f"Unsupported CosmosDB command type: {command_type}")
-            return
+            return None
 
-        start_time = time.perf_counter()
-        try:
-            result = db_op()
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            logging.debug(f"CosmosDB {command_type} command result: {result}")
-            length = sys.getsizeof(result)
-            self._fire_event('CosmosDB', task_name, total_time, response_length=length)
-        except exceptions.CosmosResourceNotFoundError:
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event(f'CosmosDB-{command_type}-NotFound', task_name, total_time)
-        except Exception as e:
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event('CosmosDB-Error', task_name, total_time, exception=e)
-            logging.exception(f"Error executing CosmosDB command: {e}")
+        cache['op'] = (build_args, run)
+        return cache['op']
+
+    @staticmethod
+    def _compile_field_builder(field):
+        """Return a callable resolving field from generated values (falling back to the literal)."""
+        return lambda param_values: param_values.get(field, field)
+
+    @classmethod
+    def _compile_partition_key_builder(cls, pk_fields):
+        """Return a callable resolving the partition key (single value or hierarchical list) from generated values.
+
+        The shape of partitionKey is fixed per task, so it is resolved once here instead of on every request.
+        """
+        if isinstance(pk_fields, list):
+            if len(pk_fields) == 1:
+                return cls._compile_field_builder(pk_fields[0])
+            names = tuple(pk_fields)
+            return lambda param_values: [param_values.get(name, name) for name in names]
+        return cls._compile_field_builder(pk_fields)
+
+    def _build_batches(self, pk_builder, batch_size: int, operation: str, parameters, json_template, setters, clone):
+        """Generate batch_size documents and group them into per-partition transactional batches."""
+        columns = {param.name: DataManager.generate_param_values_batch(param, batch_size) for param in parameters}
+
+        operations_by_pk: Dict[Any, list] = {}
+        for i in range(batch_size):
+            param_values = {name: values[i] for name, values in columns.items()}
+            document = self._replace_all_params(json_template, setters, param_values, clone)
+            pk_value = pk_builder(param_values)
+            key = tuple(pk_value) if isinstance(pk_value, list) else pk_value
+            operations_by_pk.setdefault(key, (pk_value, []))[1].append((operation, (document,)))
+
+        max_ops = self._MAX_BATCH_OPERATIONS
+        return [
+            (pk_value, operations[i:i + max_ops])
+            for pk_value, operations in operations_by_pk.values()
+            for i in range(0, len(operations), max_ops)
+        ]
+
+    @staticmethod
+    def _execute_single(method, *args):
+        """Run a single-document operation; returns (1, its request charge)."""
+        collector = _ChargeCollector()
+        method(*args, response_hook=collector)
+        return 1, collector.charge
+
+    @staticmethod
+    def _execute_batches(container, batches):
+        """Run each per-partition transactional batch; returns (operation count, summed request charge)."""
+        count = 0
+        collector = _ChargeCollector()
+        for pk_value, operations in batches:
+            count += len(container.execute_item_batch(batch_operations=operations, partition_key=pk_value, response_hook=collector))
+        return count, collector.charge
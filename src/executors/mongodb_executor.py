@@ -1,40 +1,91 @@
+import atexit
 import logging
 import settings
-import sys
+import threading
 import time
 import yaml
 
 from datamanager import DataManager
 from executors.base_executor import BaseExecutor
+from functools import partial
 from pathlib import Path
-from pymongo import MongoClient
+from pymongo import DeleteOne, MongoClient, ReplaceOne, UpdateOne
 from typing import Any, Dict, Optional
 
 logging.getLogger("pymongo").setLevel(logging.INFO)
 
+# One pooled MongoClient per process and client configuration, shared by every executor
+_client_lock = threading.Lock()
+_shared_clients: Dict[Any, MongoClient] = {}
+
+def _close_shared_clients() -> None:
+    """Close the shared clients on interpreter shutdown."""
+    for client in _shared_clients.values():
+        try:
+            client.close()
+        except Exception as e:
+            logging.error(f"Error closing MongoDB client: {e}")
+    _shared_clients.clear()
+
+atexit.register(_close_shared_clients)
+
+def _single_document(result: Any) -> int:
+    """Response length of single-document operations."""
+    return 1
+
+def _inserted_count(result: Any) -> int:
+    """Response length of insert_many: number of inserted documents."""
+    return len(result.inserted_ids)
+
+def _bulk_write_count(result: Any) -> int:
+    """Response length of bulk_write: number of documents matched, upserted or deleted."""
+    return result.matched_count + result.upserted_count + result.deleted_count
+
 class MongoDBExecutor(BaseExecutor):
     def __init__(self, environment: Any):
         super().__init__(environment)
         self.client: Optional[MongoClient] = None
         self.db = None
         self._connect()
-        self._param_map_cache: Dict[str, Dict] = {}
+
+    @classmethod
+    def shareable(cls, environment: Any) -> bool:
+        # Users only share the pooled client and the compiled ops
+        return True
 
     def _connect(self) -> None:
+        # Compiled ops hold collections of the previous client
+        self._param_map_cache.clear()
         try:
-            self.client = MongoClient(
-                self.environment.parsed_options.mongodb_connection_string,
-                serverSelectionTimeoutMS=5000
-            )
-            logging.debug("MongoDB connection established.")
+            # Only pass options that were set, so connection string settings still apply otherwise
+            options = self.environment.parsed_options
+            client_kwargs = {}
+            if options.mongodb_max_pool_size:
+                client_kwargs['maxPoolSize'] = options.mongodb_max_pool_size
+            if options.mongodb_read_preference:
+                client_kwargs['readPreference'] = options.mongodb_read_preference
+            if options.mongodb_compressors:
+                client_kwargs['compressors'] = options.mongodb_compressors
+            client_key = (options.mongodb_connection_string, tuple(sorted(client_kwargs.items())))
+            with _client_lock:
+                client = _shared_clients.get(client_key)
+                if client is None:
+                    client = MongoClient(
+                        options.mongodb_connection_string,
+                        serverSelectionTimeoutMS=5000,
+                        **client_kwargs
+                    )
+                    _shared_clients[client_key] = client
+                    logging.debug("MongoDB connection established.")
+            self.client = client
         except Exception as e:
             logging.exception(f"MongoDB connection error: {e}")
             self.client = None
             self.db = None
 
     def _disconnect(self) -> None:
+        """Release this executor's reference; the shared client stays open for other users until exit."""
         if self.client:
-            self.client.close()
             self.client = None
             self.db = None
     
@@ -75,8 +126,6 @@ class MongoDBExecutor(BaseExecutor):
                         options = index.get('options', {})
 
                         dbcoll.create_index(keys, name=index_name, **options)
-
-            self._disconnect()
         except Exception as e:
             logging.error(f"Error occurred while executing startup script file: {startup}. Exception: {e}")
 
@@ -88,12 +137,46 @@ class MongoDBExecutor(BaseExecutor):
                 logging.error("Connection to MongoDB failed.")
                 return
 
-        db_name = command.get('database')
-        db = self.client[db_name]
+        command_type = command.get('type')
+        # A task's command type is fixed, so its name alone keys the compiled op
+        cache = self._param_map_cache.get(task_name)
+        op = cache.get('op') if cache else None
+        if op is None:
+            # Binding the task can fail on a bad config (e.g. a missing collection); report it as a failed request
+            start_time = time.perf_counter_ns()
+            try:
+                op = self._compile_op(command, task_name)
+            except Exception as e:
+                self._record('MongoDB-Error', task_name, start_time, exception=e)
+                logging.exception(f"Error preparing MongoDB command: {e}")
+                return
+            if op is None:
+                return
+        build_args, run, length_fn = op
+
+        # Generate parameter values and render the command documents before timing
+        args = build_args()
+        # Lazy %-style arguments: the (possibly large) documents are only formatted when DEBUG is on
+        logging.debug("Executing MongoDB %s command: %s", command_type, args)
+
+        start_time = time.perf_counter_ns()
+        try:
+            result = run(*args)
+            self._record('MongoDB', task_name, start_time, response_length=length_fn(result))
+            logging.debug("MongoDB %s command result: %s", command_type, result)
+        except Exception as e:
+            self._record('MongoDB-Error', task_name, start_time, exception=e)
+            logging.exception(f"Error executing MongoDB command: {e}")
+
+    def _compile_op(self, command: Dict, cache_key: str):
+        """Bind a task's collection, templates and options into a cached (build_args, run, length_fn) triple.
 
+        build_args() generates fresh parameter values and returns the positional arguments
+        for run, so execute only times run(*args) and never re-reads the command. length_fn
+        maps the result to the reported response length (document count).
+        """
         update_template = {}
         command_type = command.get('type')
-        batch_size = command.get('batchSize', 1)
         if command_type == 'insert':
             json_template = command.get('document', {})
         elif command_type == 'aggregate':
@@ -105,76 +188,86 @@ class MongoDBExecutor(BaseExecutor):
             elif command_type == 'replace':
                 update_template = command.get('replacement', {})
         else:
-            json_template = {}
-
-        cache_key = f"{task_name}:{command_type}"
-        cache = self._param_map_cache.get(cache_key)
-        if not cache:
-            parameters = command.get('parameters', [])
-            param_names = [param.get('name') for param in parameters]
-            param_paths_dict = self._map_all_param_paths(json_template, param_names)
-            param_paths_dict_upd = self._map_all_param_paths(update_template, param_names)
-            cache = {
-                'parameters': parameters,
-                'param_names': param_names,
-                'param_paths_dict': param_paths_dict,
-                'param_paths_dict_upd': param_paths_dict_upd
-            }
-            self._param_map_cache[cache_key] = cache
-        else:
-            parameters = cache['parameters']
-            param_names = cache['param_names']
-            param_paths_dict = cache['param_paths_dict']
-            param_paths_dict_upd = cache['param_paths_dict_upd']
-
-        bulkInsert = []
-        for i in range(batch_size):
-            param_values = {param['name']: DataManager.generate_param_value(param)[0] for param in parameters}
-            final_command = self._replace_all_params(json_template, param_paths_dict, param_values)
-            bulkInsert.append(final_command)
-        
-        upd_command = self._replace_all_params(update_template, param_paths_dict_upd, param_values)
+            logging.error(f"Unsupported MongoDB command type: {command_type}")
+            return None
+
+        cache = self._prepare_json_command(
+            cache_key,
+            command.get('parameters', []),
+            command=json_template,
+            update=update_template
+        )
+        parameters = cache['parameters']
+        setters = cache['setters']['command']
+        setters_upd = cache['setters']['update']
+        clone = cache['cloners']['command']
+        clone_upd = cache['cloners']['update']
+        replace_all_params = self._replace_all_params
+        param_generators = [(param.name, DataManager.bind_generator(param)) for param in parameters]
 
+        def generate():
+            return {name: generator() for name, generator in param_generators}
+
+        def render(param_values):
+            return replace_all_params(json_template, setters, param_values, clone)
+
+        def build_args():
+            return (render(generate()),)
+
+        database_name = command.get('database')
         collection_name = command.get('collection')
-        collection = db[collection_name] if collection_name else None
+        if not database_name or not collection_name:
+            raise ValueError(f"MongoDB {command_type} command requires 'database' and 'collection'")
+        collection = self.client[database_name][collection_name]
 
-        db_op = None
-        projection = None
-        limit = 0
-        sort = None
+        count_items = self._count_items
+        batch_size = command.get('batchSize', 1)
 
         if command_type == 'insert':
             if batch_size > 1:
-                db_op = lambda: collection.insert_many(bulkInsert, ordered=False)
+                def build_args():
+                    return ([render(generate()) for _ in range(batch_size)],)
+                run = partial(collection.insert_many, ordered=False)
+                length_fn = _inserted_count
             else:
-                db_op = lambda: collection.insert_one(final_command)
+                run = collection.insert_one
+                length_fn = _single_document
         elif command_type == 'aggregate':
-            db_op = lambda: collection.aggregate(final_command).to_list()
+            def run(pipeline):
+                return count_items(collection.aggregate(pipeline))
+            length_fn = int
         elif command_type == 'find':
             projection = command.get('projection', None)
             limit = command.get('limit', 0)
             sort = command.get('sort', None)
-            db_op = lambda: collection.find(filter=final_command, projection=projection, limit=limit, sort=sort).to_list()
-        elif command_type == 'update':
-            db_op = lambda: collection.update_one(final_command, upd_command, upsert=True)
-        elif command_type == 'replace':
-            db_op = lambda: collection.replace_one(final_command, upd_command, upsert=True)
-        elif command_type == 'delete':
-            db_op = lambda: collection.delete_one(final_command)
+
+            def run(filter_doc):
+                return count_items(collection.find(filter=filter_doc, projection=projection, limit=limit, sort=sort))
+            length_fn = int
+        elif command_type in ('update', 'replace'):
+            def render_pair(param_values):
+                return render(param_values), replace_all_params(update_template, setters_upd, param_values, clone_upd)
+
+            if batch_size > 1:
+                model = UpdateOne if command_type == 'update' else ReplaceOne
+
+                def build_args():
+                    return ([model(*render_pair(generate()), upsert=True) for _ in range(batch_size)],)
+                run = partial(collection.bulk_write, ordered=False)
+                length_fn = _bulk_write_count
+            else:
+                def build_args():
+                    return render_pair(generate())
+                run = partial(collection.update_one if command_type == 'update' else collection.replace_one, upsert=True)
+                length_fn = _single_document
+        elif batch_size > 1:
+            def build_args():
+                return ([DeleteOne(render(generate())) for _ in range(batch_size)],)
+            run = partial(collection.bulk_write, ordered=False)
+            length_fn = _bulk_write_count
         else:
-            logging.error(f"Unsupported MongoDB command type: {command_type}")
-            return
-        
-        logging.debug(f"Executing MongoDB {command_type} command: {final_command}{', update: ' + str(upd_command) if upd_command else ''}{', projection: ' + str(projection) if projection else ''}{', limit: ' + str(limit) if limit else ''}{', sort: ' + str(sort) if sort else ''}")
+            run = collection.delete_one
+            length_fn = _single_document
 
-        start_time = time.perf_counter()
-        try:
-            result = db_op()
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            logging.debug(f"MongoDB {command_type} command result: {result}")
-            length = sys.getsizeof(result)
-            self._fire_event('MongoDB', task_name, total_time, response_length=length)
-        except Exception as e:
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event('MongoDB-Error', task_name, total_time, exception=e)
-            logging.exception(f"Error executing MongoDB command: {e}")
+        cache['op'] = (build_args, run, length_fn)
+        return cache['op']
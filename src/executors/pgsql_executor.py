@@ -1,18 +1,86 @@
+import atexit
+import itertools
 import logging
 import psycopg
+import re
+import threading
 import time
 
+from dataclasses import dataclass
 from datamanager import DataManager
 from executors.base_executor import BaseExecutor
+from functools import partial
 from psycopg import DatabaseError
-from typing import Any, Dict, Optional
+from psycopg_pool import ConnectionPool
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Connection pools shared by every executor of a worker process (--pgsql-pool-size), keyed by connection string and size
+_pool_lock = threading.Lock()
+_shared_pools: Dict[Any, ConnectionPool] = {}
+
+def _close_shared_pools() -> None:
+    """Close the shared pools on interpreter shutdown."""
+    for pool in _shared_pools.values():
+        try:
+            pool.close()
+        except Exception as e:
+            logging.error(f"Error closing PGSQL connection pool: {e}")
+    _shared_pools.clear()
+
+atexit.register(_close_shared_pools)
+
+def _paginate(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield rows in lists of at most size items, consuming rows lazily."""
+    iterator = iter(rows)
+    while page := list(itertools.islice(iterator, size)):
+        yield page
+
+@dataclass(frozen=True, slots=True)
+class TaskPlan:
+    """A PGSQL task's command, resolved once on its first execution.
+
+    build_args() generates the parameters for one request; run(cursor, args) is specialized
+    for the task's execution strategy (single row, multi-row VALUES, COPY, pipeline or executemany).
+    """
+    exec_command: str
+    batch_size: int
+    build_args: Callable[[], Any]
+    run: Callable[[psycopg.Cursor, Any], None]
 
 class PGSQLExecutor(BaseExecutor):
+    # Pipeline mode needs libpq 14+; checked once per process
+    _pipeline_supported = psycopg.Pipeline.is_supported()
+    # Plain single-row INSERT whose VALUES are all placeholders, e.g. INSERT INTO t (a, b) VALUES (@a, @b)
+    _simple_insert_pattern = re.compile(
+        r'^\s*INSERT\s+INTO\s+([\w."]+)\s*\(([^()]+)\)\s*VALUES\s*\(\s*(@\w+(?:\s*,\s*@\w+)*)\s*\)\s*;?\s*$',
+        re.IGNORECASE
+    )
+    # Batches of at least this many rows of a simple INSERT are streamed with COPY
+    _COPY_MIN_BATCH = 50
+    _values_pattern = re.compile(r'\bVALUES\s*\(', re.IGNORECASE)
+    # Protocol limit of bind parameters in one statement
+    _MAX_BIND_PARAMS = 65535
+    # Prepare every statement on first use and keep one server-side plan per task statement
+    _PREPARED_MAX = 1024
+    # Pipelined batches sync every this many rows, bounding the results queued on the client
+    _PIPELINE_PAGE = 10_000
+
     def __init__(self, environment: Any):
         super().__init__(environment)
         self.connection: Optional[psycopg.Connection] = None
-        self._connect()
-        self.prepared_params: Dict[str, str] = {}
+        # Reused by every request on the dedicated connection
+        self._cursor: Optional[psycopg.Cursor] = None
+        self._pool: Optional[ConnectionPool] = None
+        if self.environment.parsed_options.pgsql_pool_size > 0:
+            self._pool = self._get_pool()
+        else:
+            self._connect()
+        self.task_plans: Dict[str, TaskPlan] = {}
+
+    @classmethod
+    def shareable(cls, environment: Any) -> bool:
+        # Pooled executors check out a connection per request; a dedicated connection serves one user
+        return environment.parsed_options.pgsql_pool_size > 0
 
     def _connect(self) -> None:
         try:
@@ -24,58 +92,225 @@ class PGSQLExecutor(BaseExecutor):
         try:
             self.connection = psycopg.connect(
                 conninfo=self.environment.parsed_options.pgsql_connection_string,
-                autocommit=True
+                autocommit=True,
+                prepare_threshold=0
             )
+            self._configure_connection(self.connection)
+            self._cursor = self.connection.cursor()
         except Exception as e:
             logging.exception(f"Connection error occurred: {e}")
             self.connection = None
+            self._cursor = None
+
+    @classmethod
+    def _configure_connection(cls, connection: psycopg.Connection) -> None:
+        connection.prepared_max = cls._PREPARED_MAX
+
+    def _get_pool(self) -> ConnectionPool:
+        """Get or create the worker's shared connection pool."""
+        options = self.environment.parsed_options
+        pool_key = (options.pgsql_connection_string, options.pgsql_pool_size)
+        with _pool_lock:
+            pool = _shared_pools.get(pool_key)
+            if pool is None:
+                pool = ConnectionPool(
+                    conninfo=options.pgsql_connection_string,
+                    min_size=options.pgsql_pool_size,
+                    max_size=options.pgsql_pool_size,
+                    kwargs={'autocommit': True, 'prepare_threshold': 0},
+                    configure=self._configure_connection,
+                    open=True
+                )
+                _shared_pools[pool_key] = pool
+                logging.debug(f"PGSQL connection pool of {options.pgsql_pool_size} connections created.")
+        return pool
     
     def _disconnect(self) -> None:
+        # A shared pool stays open for the other users until exit
         if self.connection and not self.connection.closed:
             self.connection.close()
             self.connection = None
+            self._cursor = None
 
     def execute(self, command: Dict, task_name: str) -> None:
-        if self.connection is None:
+        pool = self._pool
+        if pool is None and self.connection is None:
             logging.error("No database connection available. Attempting to reconnect.")
             self._connect()
             if self.connection is None:
                 logging.error("Reconnection failed.")
                 return
 
-        command_def = command.get('definition', '')
-        # Check for batch_size parameter (default to 1 for single execution)
-        batch_size = command.get('batchSize', 1)
-
-        if task_name not in self.prepared_params:
-            exec_command = self._replace_string_default(command_def)
-            self.prepared_params[task_name] = exec_command
-        else:
-            exec_command = self.prepared_params[task_name]
+        plan = self.task_plans.get(task_name)
+        if plan is None:
+            plan = self.task_plans[task_name] = self._compile_plan(command)
+        exec_command = plan.exec_command
+        batch_size = plan.batch_size
 
         # Generate parameter values for batch execution
-        param_values = []
-        for _ in range(batch_size):
-            batch_params = []
-            for param in command.get('parameters', []):
-                value, value_type = DataManager.generate_param_value(param)
-                batch_params.append(value)
-            param_values.append(tuple(batch_params))
+        args = plan.build_args()
 
-        logging.debug(f"Executing PGSQL command: {exec_command} with {batch_size} batch params")
+        # Lazy %-style arguments: the (possibly large) parameter rows are only formatted when DEBUG is on
+        logging.debug("Executing PGSQL command: %s with %s batch params: %s", exec_command, batch_size, args)
 
-        start_time = time.perf_counter()
+        cursor = None
+        if pool is not None:
+            # Checked out before timing: waiting for a free connection is not query latency
+            try:
+                connection = pool.getconn()
+            except Exception as e:
+                logging.exception(f"Error getting a pooled connection: {e}")
+                return
+        else:
+            cursor = self._cursor
+
+        start_time = time.perf_counter_ns()
         try:
-            with self.connection.cursor() as cursor:
-                cursor.executemany(exec_command, param_values)
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event('PGSQL', task_name, total_time, response_length=batch_size)
+            if pool is not None:
+                # Opened inside the try, so the connection goes back to the pool even if this fails
+                cursor = connection.cursor()
+            plan.run(cursor, args)
+            self._record('PGSQL', task_name, start_time, response_length=batch_size)
         except DatabaseError as e:
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event('PGSQL-Error', task_name, total_time, exception=e)
+            self._record('PGSQL-Error', task_name, start_time, exception=e)
             logging.exception(f"Operational error executing command: {e}")
-            self._connect()
+            # The pool discards broken connections when they are returned
+            if pool is None:
+                self._connect()
         except Exception as e:
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event('PGSQL-Error', task_name, total_time, exception=e)
-            logging.exception(f"Error executing command: {e}")
\ No newline at end of file
+            self._record('PGSQL-Error', task_name, start_time, exception=e)
+            logging.exception(f"Error executing command: {e}")
+        finally:
+            if pool is not None:
+                try:
+                    if cursor is not None:
+                        cursor.close()
+                    else:
+                        # The pool discards a closed connection instead of handing it out again
+                        connection.close()
+                finally:
+                    pool.putconn(connection)
+
+    def _compile_plan(self, command: Dict) -> TaskPlan:
+        """Resolve a task's statement, batch strategy and parameter generator once."""
+        command_def = command.get('definition', '')
+        # Check for batch_size parameter (default to 1 for single execution)
+        batch_size = command.get('batchSize', 1)
+        exec_command = self._replace_string_default(command_def)
+        generate_rows = DataManager.compile_batch_generator(command.get('parameters', []))
+        build_args = partial(generate_rows, batch_size)
+
+        values_statements = None
+        if batch_size > 1 and str(command.get('batchMode', '')).lower() == 'values':
+            values_statements = self._values_statements(exec_command, batch_size)
+        copy_statement = None
+        if values_statements is None and batch_size >= self._COPY_MIN_BATCH:
+            copy_statement = self._copy_statement(command_def)
+
+        if batch_size > 1 and values_statements is None and command.get('streamRows', False):
+            # Rows are generated while they are sent: only one row is alive at a time,
+            # at the cost of counting data generation in the measured time
+            generators = [DataManager.bind_generator(param) for param in command.get('parameters', [])]
+
+            def build_args():
+                return ([generator() for generator in generators] for _ in range(batch_size))
+
+        if batch_size == 1:
+            def build_args():
+                return generate_rows(1)[0]
+
+            def run(cursor, row):
+                cursor.execute(exec_command, row)
+        elif values_statements:
+            def build_args():
+                # Flatten each statement's rows into its bind parameters, in row order
+                param_values = generate_rows(batch_size)
+                values_args = []
+                offset = 0
+                for statement, rows in values_statements:
+                    values_args.append((statement, [value for row in param_values[offset:offset + rows] for value in row]))
+                    offset += rows
+                return values_args
+
+            def run(cursor, values_args):
+                # Multi-row VALUES: one statement per chunk of rows instead of one per row
+                for statement, args in values_args:
+                    cursor.execute(statement, args)
+        elif copy_statement:
+            def run(cursor, param_values):
+                # One COPY stream instead of a Bind/Execute per row
+                with cursor.copy(copy_statement) as copy:
+                    for row in param_values:
+                        copy.write_row(row)
+        elif self._pipeline_supported:
+            page_size = self._PIPELINE_PAGE
+
+            def run(cursor, param_values):
+                # Send every Bind/Execute back to back; pages after the first sync the previous one,
+                # and the pipeline syncs the last page when it exits
+                with cursor.connection.pipeline() as pipeline:
+                    for page_number, page in enumerate(_paginate(param_values, page_size)):
+                        if page_number:
+                            pipeline.sync()
+                        for row in page:
+                            cursor.execute(exec_command, row)
+        else:
+            def run(cursor, param_values):
+                cursor.executemany(exec_command, param_values)
+
+        return TaskPlan(
+            exec_command=exec_command,
+            batch_size=batch_size,
+            build_args=build_args,
+            run=run
+        )
+
+    @classmethod
+    def _copy_statement(cls, command_def: str) -> Optional[str]:
+        """Return the COPY ... FROM STDIN equivalent of a simple INSERT, or None if it has any other shape."""
+        match = cls._simple_insert_pattern.match(command_def)
+        if match is None:
+            return None
+        table, columns, values = match.groups()
+        if len(columns.split(',')) != len(values.split(',')):
+            return None
+        return f"COPY {table} ({columns.strip()}) FROM STDIN"
+
+    @classmethod
+    def _values_statements(cls, exec_command: str, batch_size: int) -> Optional[List[Tuple[str, int]]]:
+        """Fold a single-row VALUES statement into multi-row statements covering batch_size rows.
+
+        Returns (statement, row count) pairs, split so no statement exceeds the bind parameter
+        limit, or None if the statement has no VALUES tuple holding all of its placeholders.
+        """
+        match = cls._values_pattern.search(exec_command)
+        if match is None:
+            logging.warning(f"batchMode 'values' ignored, no VALUES (...) found in: {exec_command}")
+            return None
+
+        # Find the parenthesis closing the VALUES tuple
+        start = match.end() - 1
+        depth = 0
+        for end in range(start, len(exec_command)):
+            if exec_command[end] == '(':
+                depth += 1
+            elif exec_command[end] == ')':
+                depth -= 1
+                if depth == 0:
+                    break
+        else:
+            logging.warning(f"batchMode 'values' ignored, unbalanced VALUES (...) in: {exec_command}")
+            return None
+
+        head, fragment, tail = exec_command[:start], exec_command[start:end + 1], exec_command[end + 1:]
+        params_per_row = fragment.count('%s')
+        if params_per_row == 0 or params_per_row != exec_command.count('%s'):
+            logging.warning(f"batchMode 'values' ignored, all parameters must be inside VALUES (...) in: {exec_command}")
+            return None
+
+        rows_per_statement = max(1, cls._MAX_BIND_PARAMS // params_per_row)
+        statements = []
+        for offset in range(0, batch_size, rows_per_statement):
+            rows = min(rows_per_statement, batch_size - offset)
+            statements.append((head + ', '.join([fragment] * rows) + tail, rows))
+        return statements
@@ -1,20 +1,132 @@
+import atexit
 import logging
 import pymssql
+import queue
 import settings
+import threading
 import time
 
+from dataclasses import dataclass
 from datamanager import DataManager
 from executors.base_executor import BaseExecutor
+from functools import partial
 from pathlib import Path
 from pymssql import DatabaseError
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
+
+# pymssql's default session settings plus NOCOUNT ON, so no row count message follows every statement
+_CONN_PROPERTIES = [
+    "SET ARITHABORT ON;",
+    "SET CONCAT_NULL_YIELDS_NULL ON;",
+    "SET ANSI_NULLS ON;",
+    "SET ANSI_NULL_DFLT_ON ON;",
+    "SET ANSI_PADDING ON;",
+    "SET ANSI_WARNINGS ON;",
+    "SET CURSOR_CLOSE_ON_COMMIT ON;",
+    "SET QUOTED_IDENTIFIER ON;",
+    "SET TEXTSIZE 2147483647;",
+    "SET NOCOUNT ON;"
+]
+
+def _open_connection(options: Any) -> pymssql.Connection:
+    return pymssql.connect(
+        host=options.sql_server,
+        user=options.sql_user,
+        password=options.sql_password,
+        database=options.sql_db_name,
+        autocommit=True,
+        appname="locust-worker",
+        conn_properties=_CONN_PROPERTIES
+    )
+
+class _ConnectionPool:
+    """Fixed-size pool of pymssql connections (pymssql has none), shared by the executors of a worker."""
+
+    def __init__(self, connect: Callable[[], pymssql.Connection], size: int):
+        self._connect = connect
+        self._idle: queue.SimpleQueue = queue.SimpleQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def getconn(self) -> pymssql.Connection:
+        """Wait for a free slot and return an idle connection, opening a new one if none is idle."""
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection: pymssql.Connection, broken: bool = False) -> None:
+        """Return a connection to the pool; broken connections are closed and reopened on demand."""
+        if broken:
+            try:
+                connection.close()
+            except Exception as e:
+                logging.error(f"Error closing broken connection: {e}")
+        else:
+            self._idle.put(connection)
+        self._slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                connection.close()
+            except Exception as e:
+                logging.error(f"Error closing pooled connection: {e}")
+
+# Connection pools shared by every executor of a worker process (--sql-pool-size), keyed by server, database, user and size
+_pool_lock = threading.Lock()
+_shared_pools: Dict[Any, _ConnectionPool] = {}
+
+def _close_shared_pools() -> None:
+    """Close the shared pools on interpreter shutdown."""
+    for pool in _shared_pools.values():
+        pool.close()
+    _shared_pools.clear()
+
+atexit.register(_close_shared_pools)
+
+@dataclass(frozen=True, slots=True)
+class TaskPlan:
+    """A SQL task's command, resolved once on its first execution.
+
+    build_params() generates the parameters for one request; run(cursor, params) is
+    specialized for the task's command type.
+    """
+    command_type: str
+    exec_command: str
+    build_params: Callable[[], Any]
+    run: Callable[[pymssql.Cursor, Any], None]
+    batch_size: int
 
 class SQLExecutor(BaseExecutor):
+    # Rows per bcp commit batch: larger batches of a bulk_insert are committed in slabs of this size
+    _MAX_BCP_BATCH = 50_000
+
     def __init__(self, environment: Any):
         super().__init__(environment)
         self.connection: Optional[pymssql.Connection] = None
-        self._connect()
-        self.prepared_params: Dict[str, str] = {}
+        # Reused by every request on the dedicated connection
+        self._cursor: Optional[pymssql.Cursor] = None
+        self._pool: Optional[_ConnectionPool] = None
+        if self.environment.parsed_options.sql_pool_size > 0:
+            self._pool = self._get_pool()
+        else:
+            self._connect()
+        self.task_plans: Dict[str, TaskPlan] = {}
+
+    @classmethod
+    def shareable(cls, environment: Any) -> bool:
+        # Pooled executors check out a connection per request; a dedicated connection serves one user
+        return environment.parsed_options.sql_pool_size > 0
 
     def _connect(self) -> None:
         try:
@@ -24,22 +136,30 @@ class SQLExecutor(BaseExecutor):
             logging.exception(f"Error closing existing connection: {e}")
 
         try:
-            self.connection = pymssql.connect(
-                host=self.environment.parsed_options.sql_server,
-                user=self.environment.parsed_options.sql_user,
-                password=self.environment.parsed_options.sql_password,
-                database=self.environment.parsed_options.sql_db_name,
-                autocommit=True,
-                appname="locust-worker"
-            )
+            self.connection = _open_connection(self.environment.parsed_options)
+            self._cursor = self.connection.cursor()
         except Exception as e:
             logging.exception(f"Connection error occurred: {e}")
             self.connection = None
+            self._cursor = None
+
+    def _get_pool(self) -> _ConnectionPool:
+        """Get or create the worker's shared connection pool."""
+        options = self.environment.parsed_options
+        pool_key = (options.sql_server, options.sql_db_name, options.sql_user, options.sql_pool_size)
+        with _pool_lock:
+            pool = _shared_pools.get(pool_key)
+            if pool is None:
+                pool = _ConnectionPool(partial(_open_connection, options), options.sql_pool_size)
+                _shared_pools[pool_key] = pool
+        return pool
 
     def _disconnect(self) -> None:
+        # A shared pool stays open for the other users until exit
         if self.connection:
             self.connection.close()
             self.connection = None
+            self._cursor = None
 
     def run_startup(self, workloadName: str) -> None:
         
@@ -51,7 +171,11 @@ class SQLExecutor(BaseExecutor):
             with open(startup, 'r', encoding='utf-8') as file:
                 sql_commands = file.read()
 
-            with self.connection.cursor(as_dict=True) as cursor:
+            # Pooled executors hold no connection of their own; open one for the script
+            if self.connection is None:
+                self._connect()
+
+            with self.connection.cursor() as cursor:
                 for command in sql_commands.split(';'):
                     command = command.strip()
                     if command:
@@ -62,87 +186,143 @@ class SQLExecutor(BaseExecutor):
             logging.error(f"Error occurred while executing startup script file: {startup}. Exception: {e}")
 
     def execute(self, command: Dict, task_name: str) -> None:
-        if self.connection is None:
+        pool = self._pool
+        if pool is None and self.connection is None:
             logging.error("No database connection available. Attempting to reconnect.")
             self._connect()
             if self.connection is None:
                 logging.error("Reconnection failed.")
                 return
 
-        batch_tuples: list[tuple] = []
-        param_tuples = []
-        param_values = []
-        param_defs = []
-        column_ids: list[int] = []
-        param_def_str = None
-        batch_size = 1
+        plan = self.task_plans.get(task_name)
+        if plan is None:
+            plan = self.task_plans[task_name] = self._compile_plan(command)
+        command_type = plan.command_type
+        exec_command = plan.exec_command
+        batch_size = plan.batch_size
+
+        params = plan.build_params()
+
+        # Lazy %-style arguments: the (possibly large) parameter rows are only formatted when DEBUG is on
+        logging.debug("Executing SQL %s command: %s with params: %s, batch size: %s", command_type, exec_command, params, batch_size)
+
+        broken = False
+        cursor = None
+        if pool is not None:
+            # Checked out before timing: waiting for a free connection is not query latency
+            try:
+                connection = pool.getconn()
+            except Exception as e:
+                logging.exception(f"Error getting a pooled connection: {e}")
+                return
+        else:
+            cursor = self._cursor
+
+        start_time = time.perf_counter_ns()
+        try:
+            if pool is not None:
+                # Opened inside the try, so the connection goes back to the pool even if this fails
+                cursor = connection.cursor()
+            plan.run(cursor, params)
+            self._record('SQL', task_name, start_time, response_length=1)
+        except DatabaseError as e:
+            self._record('SQL-Error', task_name, start_time, exception=e)
+            logging.exception(f"Operational error executing command: {e}")
+            if pool is None:
+                self._connect()
+            else:
+                broken = True
+        except Exception as e:
+            self._record('SQL-Error', task_name, start_time, exception=e)
+            logging.exception(f"Error executing command: {e}")
+        finally:
+            if pool is not None:
+                try:
+                    if cursor is not None:
+                        cursor.close()
+                finally:
+                    # A connection that could not open a cursor is closed rather than reused
+                    pool.putconn(connection, broken or cursor is None)
+
+    def _compile_plan(self, command: Dict) -> TaskPlan:
+        """Resolve a task's command type, statement and parameter generators once.
 
+        build_params() returns the ready-to-send parameters: a list of values (prefixed with the
+        statement and its parameter definitions for sp_executesql), or the row tuples for bulk_insert
+        (a list, or a generator when streamRows is set).
+        """
         command_def = command.get('definition', '')
-        command_type = command.get('type', 'prepared').lower()
+        command_type = command.get('type', 'prepared')
         if command_type not in ['ad-hoc', 'stored_procedure', 'prepared', 'bulk_insert']:
             command_type = 'ad-hoc'
 
+        parameters = command.get('parameters', [])
+        generators = [DataManager.bind_generator(param) for param in parameters]
+
+        # pymssql binds any sequence, so rows stay the lists they are built as
+        def generate_row():
+            return [generator() for generator in generators]
+
+        batch_size = 1
+        build_params = generate_row
         if command_type == 'prepared':
             exec_command = 'sp_executesql'
-            param_tuples.append(command_def)
-            if task_name in self.prepared_params:
-                param_def_str = self.prepared_params[task_name]
+            param_def_str = self._param_definitions(parameters)
+
+            def build_params():
+                params = [command_def, param_def_str]
+                params.extend([generator() for generator in generators])
+                return params
         elif command_type == 'ad-hoc':
-            if task_name not in self.prepared_params:
-                exec_command = self._replace_string_default(command_def)
-                self.prepared_params[task_name] = exec_command
-            else:
-                exec_command = self.prepared_params[task_name]
+            exec_command = self._replace_string_default(command_def)
         elif command_type == 'bulk_insert':
-            table_name = command.get('tableName', '')
-            exec_command = table_name
+            exec_command = command.get('tableName', '')
             batch_size = command.get('batchSize', 1000)
             column_ids = command.get('columnIds', None)
-        else:
-            exec_command = command_def
+            # One bcp session per request; its rows are committed in slabs on the same connection
+            bcp_batch_size = min(batch_size, self._MAX_BCP_BATCH)
+            # TABLOCK takes a bulk update lock, allowing minimally logged inserts
+            tablock = bool(command.get('tablock', False))
 
-        for _ in range(batch_size):
-            param_values = []
-            for param in command.get('parameters', []):
-                value, value_type = DataManager.generate_param_value(param)
-                param_values.append(value)
-                if command_type == 'prepared' and param_def_str is None:
-                    name = param.get('name')
-                    sql_type = param.get('sqldatatype', value_type).upper()
-                    param_defs.append(f"{name} {sql_type}")
-            batch_tuples.append(tuple(param_values))
+            def run(cursor, rows):
+                cursor.connection.bulk_copy(exec_command, rows, batch_size=bcp_batch_size, column_ids=column_ids, tablock=tablock)
 
-        if param_def_str is None:
-            param_def_str = ', '.join(param_defs)
+            if command.get('streamRows', False):
+                # Rows are generated while bulk_copy sends them: only one row is alive at a time,
+                # at the cost of counting data generation in the measured time
+                def build_params():
+                    return (generate_row() for _ in range(batch_size))
+            else:
+                generate_rows = DataManager.compile_batch_generator(parameters)
 
-        if command_type == 'prepared':
-            param_tuples.append(param_def_str)
+                def build_params():
+                    return generate_rows(batch_size)
+        else:
+            exec_command = command_def
 
-        param_tuples = param_tuples + param_values
+        if command_type == 'ad-hoc':
+            def run(cursor, params):
+                cursor.execute(exec_command, params)
+        elif command_type != 'bulk_insert':
+            # prepared (sp_executesql) and stored_procedure are RPC calls
+            def run(cursor, params):
+                cursor.callproc(exec_command, params)
 
-        logging.debug(f"Executing SQL {command_type} command: {exec_command} with params: {batch_tuples if command_type == 'bulk_insert' else param_tuples}, batch size: {batch_size}")
+        return TaskPlan(
+            command_type=command_type,
+            exec_command=exec_command,
+            build_params=build_params,
+            run=run,
+            batch_size=batch_size
+        )
 
-        if command_type == 'bulk_insert':
-            db_op = lambda: self.connection.bulk_copy(table_name, batch_tuples, batch_size=batch_size, column_ids=column_ids)
-        else:
-            def db_op():
-                with self.connection.cursor(as_dict=True) as cursor:
-                    if command_type == 'ad-hoc':
-                        cursor.execute(exec_command, tuple(param_tuples))
-                    else:
-                        cursor.callproc(exec_command, tuple(param_tuples))
-
-        start_time = time.perf_counter()
-        try:
-            db_op()
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event('SQL', task_name, total_time, response_length=1)
-        except DatabaseError as e:
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event('SQL-Error', task_name, total_time, exception=e)
-            logging.exception(f"Operational error executing command: {e}")
-            self._connect()
-        except Exception as e:
-            total_time = int((time.perf_counter() - start_time) * 1000)
-            self._fire_event('SQL-Error', task_name, total_time, exception=e)
-            logging.exception(f"Error executing command: {e}")
\ No newline at end of file
+    @staticmethod
+    def _param_definitions(parameters: List[settings.ParamConfig]) -> str:
+        """Build the sp_executesql parameter definition string, e.g. '@id INT, @name NVARCHAR(50)'.
+
+        SQL types are inferred from a sample value unless sqldatatype is set.
+        """
+        return ', '.join(
+            f"{param.name} {(param.sqldatatype or DataManager.generate_param_value(param)[1]).upper()}"
+            for param in parameters
+        )
@@ -8,35 +8,50 @@ from executors.cassandra_executor import CassandraExecutor
 import settings
 from settings import Settings, StartUpFrequency
 import logging
-from typing import Any, Callable
+import sys
+import threading
+from typing import Any, Callable, Dict
 
 logging.basicConfig(level=logging.INFO)
 all_profiles = settings.init_settings()
 
+# Command line options registered for each workload type found in the config directory
+_CLI_ARGS = {
+    "SQL": [
+        ("--sql-server", {"type": str, "is_required": True, "help": "Server URI or IP address[:<port>]"}),
+        ("--sql-user", {"type": str, "is_required": True, "help": "User Name"}),
+        ("--sql-password", {"type": str, "is_required": True, "is_secret": True, "help": "User Password"}),
+        ("--sql-db-name", {"type": str, "is_required": True, "help": "Database Name"}),
+        ("--sql-pool-size", {"type": int, "default": 0, "help": "Connections shared by all users of a worker process. Default: 0 (one connection per user)"}),
+    ],
+    "PGSQL": [
+        ("--pgsql-connection-string", {"type": str, "is_required": True, "is_secret": True, "help": "Format: postgresql://<server_name>.postgres.database.azure.com:<port>/postgres?sslmode=require"}),
+        ("--pgsql-pool-size", {"type": int, "default": 0, "help": "Connections shared by all users of a worker process. Default: 0 (one connection per user)"}),
+    ],
+    "MONGODB": [
+        ("--mongodb-connection-string", {"type": str, "is_required": True, "is_secret": True, "help": "Format: mongodb+srv://<username>:<password>@<cluster-address>/?tls=true&authMechanism=SCRAM-SHA-256&retrywrites=false&maxIdleTimeMS=120000"}),
+        ("--mongodb-max-pool-size", {"type": int, "default": 0, "help": "Maximum connections per worker process. Default: 0 (connection string or driver default of 100)"}),
+        ("--mongodb-compressors", {"type": str, "default": "", "help": "Comma-separated wire compressors in preference order (zlib, snappy, zstd). Default: none"}),
+        ("--mongodb-read-preference", {"type": str, "default": "", "help": "primary, primaryPreferred, secondary, secondaryPreferred or nearest. Default: connection string or primary"}),
+    ],
+    "COSMOSDB": [
+        ("--cosmosdb-connection-string", {"type": str, "is_required": True, "is_secret": True, "help": "Format: AccountEndpoint=<your-account-endpoint>;AccountKey=<your-account-key>;"}),
+        ("--cosmosdb-preferred-regions", {"type": str, "default": "", "help": "Comma-separated list of regions to route requests to, in priority order (e.g. East US,West US). Default: account write region"}),
+    ],
+    "CASSANDRA": [
+        ("--cassandra-contact-points", {"type": str, "is_required": True, "help": "Comma-separated list - IP addresses or hostnames"}),
+        ("--cassandra-port", {"type": int, "default": 9042, "is_required": True, "help": "Default: 9042"}),
+        ("--cassandra-username", {"type": str, "is_required": True, "help": "User Name"}),
+        ("--cassandra-password", {"type": str, "is_secret": True, "is_required": True, "help": "User Password"}),
+    ],
+}
+
 @events.init_command_line_parser.add_listener
 def _(parser):
-    added_types = set()
-    for setting in all_profiles:
-        load_type = setting.type
-        if load_type in added_types:
-            continue
-        if load_type == "SQL":
-            parser.add_argument("--sql-server", type=str, is_required=True, help="Server URI or IP address[:<port>]")
-            parser.add_argument("--sql-user", type=str, is_required=True, help="User Name")
-            parser.add_argument("--sql-password", type=str, is_required=True, is_secret=True, help="User Password")
-            parser.add_argument("--sql-db-name", type=str, is_required=True, help="Database Name")
-        elif load_type == "PGSQL":
-            parser.add_argument("--pgsql-connection-string", type=str, is_required=True, is_secret=True, help="Format: postgresql://<server_name>.postgres.database.azure.com:<port>/postgres?sslmode=require")
-        elif load_type == "MONGODB":
-            parser.add_argument("--mongodb-connection-string", type=str, is_required=True, is_secret=True, help="Format: mongodb+srv://<username>:<password>@<cluster-address>/?tls=true&authMechanism=SCRAM-SHA-256&retrywrites=false&maxIdleTimeMS=120000")
-        elif load_type == "COSMOSDB":
-            parser.add_argument("--cosmosdb-connection-string", type=str, is_required=True, is_secret=True, help="Format: AccountEndpoint=<your-account-endpoint>;AccountKey=<your-account-key>;")
-        elif load_type == "CASSANDRA":
-            parser.add_argument("--cassandra-contact-points", type=str, is_required=True, help="Comma-separated list - IP addresses or hostnames")
-            parser.add_argument("--cassandra-port", type=int, default=9042, is_required=True, help="Default: 9042")
-            parser.add_argument("--cassandra-username", type=str, is_required=True, help="User Name")
-            parser.add_argument("--cassandra-password", type=str, is_secret=True, is_required=True, help="User Password")
-        added_types.add(load_type)
+    # Each workload type's options are added once, in the order the types first appear
+    for load_type in dict.fromkeys(setting.type for setting in all_profiles):
+        for name, kwargs in _CLI_ARGS.get(load_type, ()):
+            parser.add_argument(name, **kwargs)
 
 @events.test_start.add_listener
 def on_test_start(environment, **kwargs):
@@ -45,69 +60,112 @@ def on_test_start(environment, **kwargs):
             if uc.runStartUp:
                 environment.runner.state = "running"
                 logging.info(f"Running startup for user class: {uc.__name__}")
-                uc(environment).run_startup()
+                user = uc(environment)
+                user.run_startup()
+                # This user never runs, so on_stop will not release its executor
+                user.release_executor()
             else:
                 logging.info(f"Skipping startup for user class: {uc.__name__}")
 
+_EXECUTORS = {
+    "SQL": SQLExecutor,
+    "PGSQL": PGSQLExecutor,
+    "MONGODB": MongoDBExecutor,
+    "COSMOSDB": CosmosDBExecutor,
+    "CASSANDRA": CassandraExecutor
+}
+
+# Executors without per-user connections, shared by every user of a workload type in this worker process
+_executor_lock = threading.Lock()
+_shared_executors: Dict[str, Any] = {}
+
 def get_executor(load_type: str, environment: Any):
-    if load_type == "SQL":
-        return SQLExecutor(environment)
-    elif load_type == "PGSQL":
-        return PGSQLExecutor(environment)
-    elif load_type == "MONGODB":
-        return MongoDBExecutor(environment)
-    elif load_type == "COSMOSDB":
-        return CosmosDBExecutor(environment)
-    elif load_type == "CASSANDRA":
-        return CassandraExecutor(environment)
-    else:
-        logging.error(f"Unsupported type: {load_type}. Supported types are SQL, PGSQL, MONGODB, COSMOSDB, and CASSANDRA.")
+    executor_class = _EXECUTORS.get(load_type)
+    if executor_class is None:
+        logging.error(f"Unsupported type: {load_type}. Supported types are {', '.join(_EXECUTORS)}.")
         return None
+    if not executor_class.shareable(environment):
+        return executor_class(environment)
+    with _executor_lock:
+        executor = _shared_executors.get(load_type)
+        if executor is None:
+            executor = _shared_executors[load_type] = executor_class(environment)
+    return executor
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    # Fired once every user has stopped; the next test run creates fresh executors
+    with _executor_lock:
+        executors = list(_shared_executors.values())
+        _shared_executors.clear()
+    for executor in executors:
+        try:
+            executor._disconnect()
+        except Exception as e:
+            logging.error(f"Error disconnecting shared executor: {e}")
 
 def create_task_function(command, task_name) -> Callable:
-    def task_func(self):
-        self.executor.execute(command, task_name)
+    # Bound as defaults: read as fast locals instead of closure cells on every task run
+    def task_func(self, _command=command, _task_name=task_name):
+        self.executor.execute(_command, _task_name)
     task_func.__name__ = task_name
     return task_func
 
-def create_user_class(class_name: str, workload_settings: Settings):
-    executor_factory = lambda env: get_executor(workload_settings.type, env)
+class BaseDynamicUser(User):
+    """Behavior shared by every workload's user class; create_user_class sets the per-workload attributes."""
+    abstract = True
+    runStartUp = False
+    _load_type: str = ""
+    workload_settings: Settings = None
 
-    class DynamicUser(User):
+    def __init__(self, environment, *args, **kwargs):
+        super().__init__(environment, *args, **kwargs)
+        self._executor = None
 
-        runStartUp = workload_settings.runStartUpFrequency != StartUpFrequency.NEVER
+    @property
+    def executor(self):
+        # Connected on the user's first task, so connections open at the spawn rate rather than all at once
+        if self._executor is None:
+            self._executor = get_executor(self._load_type, self.environment)
+        return self._executor
 
-        def __init__(self, environment, *args, **kwargs):
-            super().__init__(environment, *args, **kwargs)
-            self.executor = executor_factory(environment)
-            self.workload_settings = workload_settings
+    def run_startup(self):
+        if self.executor and self.__class__.runStartUp:
+            self.executor.run_startup(self.workload_settings.workloadName)
+            self.__class__.runStartUp = self.workload_settings.runStartUpFrequency == StartUpFrequency.ALWAYS
 
-        def run_startup(self):
-            if self.executor and self.__class__.runStartUp:
-                self.executor.run_startup(self.workload_settings.workloadName)
-                self.__class__.runStartUp = self.workload_settings.runStartUpFrequency == StartUpFrequency.ALWAYS
+    def on_stop(self):
+        super().on_stop()
+        self.release_executor()
 
-        def on_stop(self):
-            super().on_stop()
+    def release_executor(self):
+        # A user that never ran a task has no executor to disconnect; shared executors are disconnected on test stop
+        if self._executor and not type(self._executor).shareable(self.environment):
+            try:
+                self._executor._disconnect()
+            except Exception as e:
+                logging.error(f"Error disconnecting executor: {e}")
 
-            if self.executor:
-                try:
-                    self.executor._disconnect()
-                except Exception as e:
-                    logging.error(f"Error disconnecting executor: {e}")
+def create_user_class(class_name: str, workload_settings: Settings):
+    attrs = {
+        '__module__': __name__,
+        'runStartUp': workload_settings.runStartUpFrequency != StartUpFrequency.NEVER,
+        '_load_type': workload_settings.type,
+        'workload_settings': workload_settings
+    }
 
-    task_list = []
+    # Locust expands {task: weight} into its task list when the class is created
+    task_weights = {}
     for task_def in workload_settings.tasks:
-        fullTaskName = f"{workload_settings.workloadName}_{task_def.taskName}"
+        # Interned: the name keys the executor's plan caches and Locust's stats entries on every request
+        fullTaskName = sys.intern(f"{workload_settings.workloadName}_{task_def.taskName}")
         func = create_task_function(task_def.command, fullTaskName)
-        setattr(DynamicUser, task_def.taskName, func)
+        attrs[task_def.taskName] = func
         logging.info(f"Adding task {task_def.taskName}:weight {task_def.taskWeight} to user class {class_name}")
-        for i in range(task_def.taskWeight):
-            task_list.append(func)
-    
-    DynamicUser.tasks = task_list
-    DynamicUser.__name__ = class_name
-    return DynamicUser
+        task_weights[func] = task_def.taskWeight
+    attrs['tasks'] = task_weights
+
+    return type(class_name, (BaseDynamicUser,), attrs)
 
 classes = {}
 for setting in all_profiles:
@@ -115,4 +173,5 @@ for setting in all_profiles:
     logging.info(f"Creating user class: {new_class_name}")
     classes[new_class_name] = create_user_class(new_class_name, setting)
 
-globals().update({cls.__name__: cls for cls in classes.values()})
\ No newline at end of file
+# classes is already keyed by class name: expose every user class to Locust in one update
+globals().update(classes)
\ No newline at end of file
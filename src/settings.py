@@ -1,17 +1,67 @@
-from typing import List, Dict, Any
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from enum import Enum
-import json
+import fastjsonschema
 import logging
 import yaml
 
+# libyaml's C loader when PyYAML was built with it, the pure-Python loader otherwise
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# orjson parses JSON configs when installed, the standard library otherwise
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# Workload configs are checked against the schema shipped next to this module, compiled once at import
+_SCHEMA_PATH = Path(__file__).parent / 'config_schema.json'
+_validate_config = fastjsonschema.compile(_json_loads(_SCHEMA_PATH.read_text(encoding='utf-8')))
+
 class StartUpFrequency(Enum):
     NEVER = "never"
     ONCE = "once"
     ALWAYS = "always"
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class ParamConfig:
+    name: str
+    type: str
+    as_type: Optional[str] = None
+    format: Optional[str] = None
+    start: Any = None
+    end: Any = None
+    choices: List[Any] = field(default_factory=list)
+    chars: Optional[str] = None
+    length: Optional[int] = None
+    value: Any = None
+    args: Dict[str, Any] = field(default_factory=dict)
+    sqldatatype: Optional[str] = None
+
+    @staticmethod
+    def from_dict(data: dict):
+        return ParamConfig(
+            name=data.get("name", ""),
+            type=data.get("type"),
+            as_type=data.get("as"),
+            format=data.get("format"),
+            start=data.get("start"),
+            end=data.get("end"),
+            choices=data.get("list", []),
+            chars=data.get("chars"),
+            length=data.get("length"),
+            value=data.get("value"),
+            args=data.get("args", {}),
+            sqldatatype=data.get("sqldatatype")
+        )
+
+@dataclass(frozen=True, slots=True)
 class TaskConfig:
     taskWeight: int
     taskName: str
@@ -19,13 +69,23 @@ class TaskConfig:
 
     @staticmethod
     def from_dict(data: dict):
+        command = data.get("command", {})
+        if "parameters" in command:
+            command = {**command, "parameters": [ParamConfig.from_dict(param) for param in command["parameters"]]}
+        if isinstance(command.get("type"), str):
+            # Command types are case-insensitive; executors compare the lower-case form as loaded
+            command = {**command, "type": command["type"].lower()}
+        if "batchSize" in command:
+            # Executors use it in range() and slicing, so a float such as 5.0 (a valid integer to the schema) becomes an int
+            command = {**command, "batchSize": int(command["batchSize"])}
         return TaskConfig(
-            taskWeight=data.get("taskWeight", 1),
+            # Plain int whatever the config spelled (e.g. 2.0 or "2"), as Locust repeats each task weight times
+            taskWeight=int(data.get("taskWeight", 1)),
             taskName=data.get("taskName"),
-            command=data.get("command", {})
+            command=command
         )
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Settings:
     workloadName: str
     type: str
@@ -39,17 +99,25 @@ def get_config_path() -> Path:
 
 def load_tasks(config: dict) -> List[TaskConfig]:
     tasks = []
-    name_count = {}
+    # Repeated task names get a _1, _2, ... suffix in order of appearance; the counts are local
+    # to this call and the config is not modified, so loading the same config again is idempotent
+    name_count = defaultdict(int)
     for task in config.get("tasks", []):
         base_name = task.get("taskName")
-        if base_name in name_count:
-            name_count[base_name] += 1
-            task["taskName"] = f"{base_name}_{name_count[base_name]}"
-        else:
-            name_count[base_name] = 0
+        index = name_count[base_name]
+        name_count[base_name] = index + 1
+        if index:
+            task = {**task, "taskName": f"{base_name}_{index}"}
         tasks.append(TaskConfig.from_dict(task))
     return tasks
 
+# Settings already loaded by this process, by the config files and their modification times.
+# There is deliberately no cross-process cache: Locust imports the locustfile (and so loads the
+# settings) before forking --processes workers, which inherit them, and workers on other hosts
+# cannot share a local file anyway. A cache file in a shared directory such as /tmp would also
+# let another local user feed settings (or, with pickle, code) to this process.
+_loaded_settings: Dict[Tuple[Tuple[str, int], ...], List[Settings]] = {}
+
 def init_settings() -> List[Settings]:
 
     config_dir = get_config_path()
@@ -61,33 +129,63 @@ def init_settings() -> List[Settings]:
         logging.warning(f"Config directory {config_dir} does not exist.")
         return settings_list
 
-    for config_file in config_dir.glob('*'):
-        if config_file.suffix.lower() not in ['.json', '.yaml', '.yml'] or config_file.stem.lower().endswith('_startup'):
-            continue
-        try:
-            with open(config_file, 'r', encoding='utf-8') as file:
-                if config_file.suffix.lower() == '.json':
-                    config = json.load(file)
-                else:
-                    config = yaml.safe_load(file)
-            workload_name = config_file.stem
-            config_type = config.get("type", "")
-            
-            run_startup_frequency_value = config.get("runStartUpFrequency", "Never")
-            frequency_mapping = {
-                    "never": StartUpFrequency.NEVER,
-                    "once": StartUpFrequency.ONCE,
-                    "always": StartUpFrequency.ALWAYS
-                }
-            run_startup_frequency = frequency_mapping.get(run_startup_frequency_value.lower(),StartUpFrequency.NEVER)
-
-            tasks = load_tasks(config)
-            settings_list.append(Settings(
-                workloadName=workload_name,
-                type=config_type.upper(),
-                runStartUpFrequency=run_startup_frequency,
-                tasks=tasks
-            ))
-        except Exception as e:
-            logging.error(f"Failed to load {config_file}: {e}")
-    return settings_list
\ No newline at end of file
+    config_files = [
+        config_file for config_file in config_dir.glob('*')
+        if config_file.suffix.lower() in ['.json', '.yaml', '.yml'] and not config_file.stem.lower().endswith('_startup')
+    ]
+    if not config_files:
+        return settings_list
+
+    # Repeated calls with unchanged files reuse this process's settings
+    signature = _settings_signature(config_files)
+    loaded = _loaded_settings.get(signature)
+    if loaded is not None:
+        return list(loaded)
+
+    # Files are parsed concurrently; map keeps the directory order
+    with ThreadPoolExecutor(max_workers=min(8, len(config_files))) as executor:
+        settings_list = [setting for setting in executor.map(_load_settings_file, config_files) if setting is not None]
+
+    # Only a complete load is cached, so a broken file is logged again on the next call
+    if len(settings_list) == len(config_files):
+        _loaded_settings[signature] = list(settings_list)
+    return settings_list
+
+def _settings_signature(config_files: List[Path]) -> Tuple[Tuple[str, int], ...]:
+    """The config files and the schema with their modification times, which change whenever one is edited."""
+    return tuple((str(path), path.stat().st_mtime_ns) for path in sorted(config_files) + [_SCHEMA_PATH])
+
+def _load_settings_file(config_file: Path) -> Optional[Settings]:
+    """Parse one workload config file, or log the error and return None."""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as file:
+            if config_file.suffix.lower() == '.json':
+                config = _json_loads(file.read())
+            else:
+                config = yaml.load(file, Loader=_YamlLoader)
+        _validate_config(config)
+        workload_name = config_file.stem
+        config_type = config.get("type", "")
+        
+        run_startup_frequency_value = config.get("runStartUpFrequency", "Never")
+        frequency_mapping = {
+                "never": StartUpFrequency.NEVER,
+                "once": StartUpFrequency.ONCE,
+                "always": StartUpFrequency.ALWAYS
+            }
+        run_startup_frequency = frequency_mapping.get(run_startup_frequency_value.lower(),StartUpFrequency.NEVER)
+
+        tasks = load_tasks(config)
+        return Settings(
+            workloadName=workload_name,
+            type=config_type.upper(),
+            runStartUpFrequency=run_startup_frequency,
+            tasks=tasks
+        )
+    except fastjsonschema.JsonSchemaValueException as e:
+        # e.g. "data.tasks[2].command.parameters[0] must contain ['name', 'type'] properties"
+        logging.error(f"Invalid config {config_file}: {e.message}")
+        return None
+    except Exception as e:
+        logging.error(f"Failed to load {config_file}: {e}")
+        return None
\ No newline at end of file